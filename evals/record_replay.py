@@ -0,0 +1,110 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+from zev.constants import DEFAULT_PROFILE, PROMPT
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.types import OptionsResponse, TokenUsage
+from zev.offline.knowledge_base import search as search_offline
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+# Provider name for recordings of the bundled offline index, which never sees the prompt
+OFFLINE_PROVIDER = "offline"
+
+
+def get_prompt_version() -> str:
+    """Changes whenever the prompt or the response schema changes, so old recordings aren't replayed for them."""
+    schema = json.dumps(OptionsResponse.model_json_schema(), sort_keys=True)
+    return hashlib.sha256((PROMPT + schema).encode("utf-8")).hexdigest()[:8]
+
+
+class QueryNotRecorded(LookupError):
+    pass
+
+
+class RecordedCall:
+    def __init__(self, response: Optional[OptionsResponse], latency: float, usage: Optional[TokenUsage]):
+        self.response = response
+        self.latency = latency
+        self.usage = usage
+
+
+class RecordReplayProvider(InferenceProvider):
+    """
+    Wraps a real provider to record its answers to a fixture file, or replays a fixture file without any network
+    access. Replays report the recorded latency and token usage, so reports are deterministic.
+    """
+
+    def __init__(self, fixture_path: Path, inner: Optional[InferenceProvider] = None):
+        self.fixture_path = fixture_path
+        self.inner = inner
+        self.fixture = json.loads(fixture_path.read_text()) if fixture_path.exists() else None
+        if inner is None and self.fixture is None:
+            raise FileNotFoundError(f"No recorded fixture at {fixture_path}")
+        self.model = inner.model if inner else self.fixture["model"]
+        self.last_call: Optional[RecordedCall] = None
+
+    @classmethod
+    def fixture_path_for(cls, provider: str, model: str, profile: str) -> Path:
+        return FIXTURES_DIR / f"{provider}__{model}__{profile}__{get_prompt_version()}.json"
+
+    def get_options(self, prompt: str, context: str) -> OptionsResponse | None:
+        if self.inner is None:
+            return self._replay(prompt)
+
+        start = time.monotonic()
+        response = self.inner.get_options(prompt=prompt, context=context)
+        self.last_call = RecordedCall(response, time.monotonic() - start, self.inner.last_usage)
+        self._record(prompt)
+        return response
+
+    def _replay(self, prompt: str) -> OptionsResponse | None:
+        recorded = self.fixture["calls"].get(prompt)
+        if recorded is None:
+            raise QueryNotRecorded(f"Query not recorded in {self.fixture_path.name}: {prompt!r}")
+        response = OptionsResponse.model_validate(recorded["response"]) if recorded["response"] else None
+        usage = TokenUsage.model_validate(recorded["usage"]) if recorded["usage"] else None
+        self.last_call = RecordedCall(response, recorded["latency"], usage)
+        self.last_usage = usage
+        return response
+
+    def _record(self, prompt: str) -> None:
+        if self.fixture is None:
+            self.fixture = {
+                "provider": self.inner.NAME,
+                "model": self.inner.model,
+                "profile": self.inner.profile,
+                "prompt_version": get_prompt_version(),
+                "calls": {},
+            }
+        call = self.last_call
+        self.fixture["calls"][prompt] = {
+            "response": call.response.model_dump() if call.response else None,
+            "latency": round(call.latency, 3),
+            "usage": call.usage.model_dump() if call.usage else None,
+        }
+        self.fixture_path.parent.mkdir(parents=True, exist_ok=True)
+        self.fixture_path.write_text(json.dumps(self.fixture, indent=2, sort_keys=True) + "\n")
+
+
+class OfflineIndexProvider(InferenceProvider):
+    """
+    Answers from the offline index bundled with zev, as `zev --offline` would. Recording it gives a baseline that
+    needs no API key: what users get without a model.
+    """
+
+    NAME = OFFLINE_PROVIDER
+
+    def __init__(self):
+        self.model = "recipes.idx"
+        self.profile = DEFAULT_PROFILE
+
+    def get_options(self, prompt: str, context: str) -> OptionsResponse | None:
+        commands = search_offline(prompt)
+        return OptionsResponse(
+            commands=commands,
+            is_valid=bool(commands),
+            explanation_if_not_valid=None if commands else "No offline match",
+        )
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Score zev's answers on a fixed corpus of queries (evals/corpus.json) and report accuracy next to latency and
+token usage for each prompt version / provider / model / profile combination.
+
+Answers are recorded once against a real provider and replayed from evals/fixtures afterwards, so the report
+can be regenerated (e.g. in CI) without network access or API keys.
+
+Usage:
+    pip install -e .
+    python evals/run_evals.py                          # replay every recorded fixture
+    python evals/run_evals.py --min-accuracy 0.8       # ...and fail if the current prompt scores lower
+    python evals/run_evals.py --record [--profile fast]  # record answers using the provider in your zev config
+    python evals/run_evals.py --record --offline       # record the offline index's answers as a baseline
+
+--min-accuracy also fails when no model was recorded with the current prompt, so a prompt change can't pass CI
+until a model's answers to it have been recorded. Offline index recordings are only a baseline to compare against:
+the prompt can't affect them, so they neither count as current-prompt recordings nor have to meet the accuracy bar.
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from record_replay import (
+    FIXTURES_DIR,
+    OFFLINE_PROVIDER,
+    OfflineIndexProvider,
+    QueryNotRecorded,
+    RecordReplayProvider,
+    get_prompt_version,
+)
+from rich.console import Console
+from rich.table import Table
+
+from zev.llms.types import OptionsResponse
+
+CORPUS_PATH = Path(__file__).parent / "corpus.json"
+
+
+@dataclass
+class QueryScore:
+    valid_ok: bool
+    pattern_ok: bool
+    dangerous_ok: bool
+
+    @property
+    def passed(self) -> bool:
+        return self.valid_ok and self.pattern_ok and self.dangerous_ok
+
+
+@dataclass
+class CombinationReport:
+    prompt_version: str
+    provider: str
+    model: str
+    profile: str
+    scores: list[QueryScore] = field(default_factory=list)
+    latencies: list[float] = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    missing: int = 0
+
+    @property
+    def accuracy(self) -> float:
+        return sum(score.passed for score in self.scores) / len(self.scores) if self.scores else 0.0
+
+    def rate(self, attribute: str) -> float:
+        return sum(getattr(score, attribute) for score in self.scores) / len(self.scores) if self.scores else 0.0
+
+
+def score_response(case: dict, response: Optional[OptionsResponse]) -> QueryScore:
+    expect_valid = case.get("valid", True)
+    if response is None:
+        return QueryScore(valid_ok=False, pattern_ok=False, dangerous_ok=False)
+
+    valid_ok = response.is_valid == expect_valid and (bool(response.commands) or not expect_valid)
+    if not expect_valid:
+        return QueryScore(valid_ok=valid_ok, pattern_ok=True, dangerous_ok=True)
+
+    patterns = [re.compile(pattern) for pattern in case.get("patterns", [])]
+    matching = [cmd for cmd in response.commands if any(p.search(cmd.command.strip()) for p in patterns)]
+    pattern_ok = bool(matching) or not patterns
+
+    # When a case says whether its answer is dangerous, the matching commands must be flagged accordingly
+    dangerous_ok = True
+    if "dangerous" in case and matching:
+        dangerous_ok = all(cmd.is_dangerous == case["dangerous"] for cmd in matching)
+    return QueryScore(valid_ok=valid_ok, pattern_ok=pattern_ok, dangerous_ok=dangerous_ok)
+
+
+def evaluate(provider: RecordReplayProvider, corpus: dict, report: CombinationReport, record: bool) -> None:
+    for case in corpus["queries"]:
+        try:
+            response = provider.get_options(prompt=case["query"], context=corpus["context"])
+        except QueryNotRecorded:
+            report.missing += 1  # the corpus has grown since this fixture was recorded
+            continue
+        report.scores.append(score_response(case, response))
+        call = provider.last_call
+        report.latencies.append(call.latency)
+        if call.usage:
+            report.input_tokens += call.usage.input_tokens
+            report.output_tokens += call.usage.output_tokens
+        if record:
+            print(f"  {'✓' if report.scores[-1].passed else '✗'} {case['id']} ({call.latency:.1f}s)")
+
+
+def print_report(reports: list[CombinationReport]) -> None:
+    table = Table(title=f"zev evals (current prompt version: {get_prompt_version()})")
+    for column in ("prompt", "provider", "model", "profile", "accuracy", "valid", "pattern", "danger flag"):
+        table.add_column(column)
+    for column in ("p50 latency", "tokens in/out per query", "not recorded"):
+        table.add_column(column, justify="right")
+
+    for report in sorted(reports, key=lambda r: (r.prompt_version, r.provider, r.model, r.profile)):
+        count = max(1, len(report.scores))
+        p50 = sorted(report.latencies)[len(report.latencies) // 2] if report.latencies else 0.0
+        table.add_row(
+            report.prompt_version,
+            report.provider,
+            report.model,
+            report.profile,
+            f"{report.accuracy:.0%}",
+            f"{report.rate('valid_ok'):.0%}",
+            f"{report.rate('pattern_ok'):.0%}",
+            f"{report.rate('dangerous_ok'):.0%}",
+            f"{p50:.2f}s",
+            f"{report.input_tokens // count}/{report.output_tokens // count}",
+            str(report.missing),
+        )
+    Console(width=160).print(table)
+
+
+def record(corpus: dict, profile: Optional[str], offline: bool = False) -> CombinationReport:
+    # pylint: disable=import-outside-toplevel
+    from zev.llms.llm import get_inference_provider
+
+    inner = OfflineIndexProvider() if offline else get_inference_provider(profile)
+    fixture_path = RecordReplayProvider.fixture_path_for(inner.NAME, inner.model, inner.profile)
+    fixture_path.unlink(missing_ok=True)  # re-recording replaces the old answers
+    provider = RecordReplayProvider(fixture_path, inner=inner)
+    print(f"Recording {inner.NAME} / {inner.model} ({inner.profile}) to {fixture_path}")
+
+    report = CombinationReport(get_prompt_version(), inner.NAME, inner.model, inner.profile)
+    evaluate(provider, corpus, report, record=True)
+    return report
+
+
+def replay_all(corpus: dict) -> list[CombinationReport]:
+    reports = []
+    for fixture_path in sorted(FIXTURES_DIR.glob("*.json")):
+        provider = RecordReplayProvider(fixture_path)
+        fixture = provider.fixture
+        report = CombinationReport(fixture["prompt_version"], fixture["provider"], fixture["model"], fixture["profile"])
+        evaluate(provider, corpus, report, record=False)
+        reports.append(report)
+    return reports
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="record answers from the configured provider")
+    parser.add_argument("--profile", help="latency profile to record with (fast, balanced or thorough)")
+    parser.add_argument("--offline", action="store_true", help="with --record, record the offline index instead")
+    parser.add_argument("--min-accuracy", type=float, help="fail if a current-prompt combination scores lower")
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS_PATH.read_text())
+    reports = [record(corpus, args.profile, offline=args.offline)] if args.record else replay_all(corpus)
+    if reports:
+        print_report(reports)
+
+    if args.min_accuracy is not None:
+        current = [r for r in reports if r.prompt_version == get_prompt_version() and r.provider != OFFLINE_PROVIDER]
+        if not current:
+            print(
+                f"No model in {FIXTURES_DIR} was recorded with the current prompt (version {get_prompt_version()}). "
+                "Record one with `python evals/run_evals.py --record` using a real provider and commit the fixture."
+            )
+            return 1
+        failing = [r for r in current if r.accuracy < args.min_accuracy]
+        if failing:
+            print(f"{len(failing)} combination(s) scored below {args.min_accuracy:.0%} with the current prompt")
+            return 1
+    elif not reports:
+        print(f"No recorded fixtures in {FIXTURES_DIR}. Record some with --record.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
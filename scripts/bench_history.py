@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare load time and memory of the history read paths on synthetic histories.
+
+"models" builds a full pydantic CommandHistoryEntry per line, which is what listing history used to do.
+"headers" is the slotted read path used to list history now, and "index" loads and ranks the history index.
+
+Usage:
+    pip install -e .
+    python scripts/bench_history.py [sizes...]    # default: 10000 100000
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from zev.command_history import (
+    CommandHistoryEntry,
+    CommandHistoryHeader,
+    CommandHistoryIndex,
+    CommandHistoryStats,
+)
+from zev.llms.types import Command, OptionsResponse
+
+
+def make_lines(size: int) -> list[bytes]:
+    response = OptionsResponse(
+        commands=[
+            Command(
+                command="find . -name '*.log' -mtime +7", short_explanation="Find old log files", is_dangerous=False
+            ),
+            Command(
+                command="find . -name '*.log' -mtime +7 -delete",
+                short_explanation="Delete old log files",
+                is_dangerous=True,
+                dangerous_explanation="Deletes files without confirmation",
+            ),
+            Command(command="du -sh *.log", short_explanation="Show log file sizes", is_dangerous=False),
+        ],
+        is_valid=True,
+    )
+    return [
+        CommandHistoryEntry(query=f"clean up old logs {i}", response=response).model_dump_json().encode("utf-8")
+        for i in range(size)
+    ]
+
+
+def make_index(size: int) -> bytes:
+    entries = {
+        f"clean up old logs {i}": CommandHistoryStats(
+            f"clean up old logs {i}", f"clean up old logs {i}", uses=i % 7 + 1, last_used=1.7e9 + i, frecency=1.5
+        )
+        for i in range(size)
+    }
+    return CommandHistoryIndex(entries).to_json().encode("utf-8")
+
+
+def load_models(lines: list[bytes]):
+    return [CommandHistoryEntry.model_validate_json(line) for line in lines]
+
+
+def load_headers(lines: list[bytes]):
+    return [CommandHistoryHeader.from_json(line) for line in lines]
+
+
+def load_index(data: bytes):
+    index = CommandHistoryIndex.from_json(data)
+    return sorted(index.entries.values(), key=lambda stats: stats.score(1.8e9), reverse=True)
+
+
+def measure(load, data) -> tuple[float, float]:
+    """Seconds and peak MiB allocated while loading. Timing and memory are measured in separate runs."""
+    gc.collect()
+    start = time.perf_counter()
+    result = load(data)
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = load(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / 2**20
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    print(f"{'entries':>8}  {'path':<8}  {'time':>8}  {'peak memory':>12}")
+    for size in sizes:
+        lines = make_lines(size)
+        index = make_index(size)
+        for name, load, data in [
+            ("models", load_models, lines),
+            ("headers", load_headers, lines),
+            ("index", load_index, index),
+        ]:
+            elapsed, peak = measure(load, data)
+            print(f"{size:>8}  {name:<8}  {elapsed:>7.3f}s  {peak:>9.1f} MiB")
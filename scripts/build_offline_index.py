@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Compile src/zev/offline/recipes.json into the memory-mapped index shipped with zev.
+Re-run this whenever recipes.json changes and commit the resulting recipes.idx.
+
+Usage:
+    pip install -e .
+    python scripts/build_offline_index.py
+"""
+
+from zev.offline.knowledge_base import INDEX_PATH, build_index
+
+if __name__ == "__main__":
+    build_index()
+    print(f"Wrote {INDEX_PATH} ({INDEX_PATH.stat().st_size} bytes)")
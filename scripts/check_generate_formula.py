@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Check scripts/generate_formula.py against recorded data, so neither PyPI nor homebrew-pypi-poet is needed.
+
+scripts/fixtures/generate_formula/cache holds a formula cache for zev 0.11.1: PyPI JSON for zev and the native
+packages (trimmed to the fields the script reads, with stand-in URLs and digests) and poet's output. The formula
+built from it is recorded next to it. Online runs are pointed at an in-process stand-in for PyPI's JSON API that
+serves the same metadata with ETags and answers revalidation with 304 Not Modified.
+
+Usage:
+    pip install -e .
+    python scripts/check_generate_formula.py
+"""
+
+import http.server
+import json
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import generate_formula
+from generate_formula import PyPICache, generate
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "generate_formula"
+VERSION = "0.11.1"
+NATIVE_VERSIONS = [("jiter", "0.9.0"), ("pydantic-core", "2.33.1")]
+
+
+class FakePyPI(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakePyPIHandler)
+        # "package/version" -> (etag, data), loaded from the recorded cache entries
+        self.releases: dict[str, tuple[str, dict]] = {}
+        for path in (FIXTURES_DIR / "cache").glob("*.json"):
+            package, _, version = path.stem.rpartition("-")
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            self.releases[f"{package}/{version}"] = (entry["etag"], entry["data"])
+        self.requests: list[tuple[str, int]] = []  # (release, status)
+
+    @property
+    def url_template(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/pypi/{{package}}/{{version}}/json"
+
+
+class FakePyPIHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        server: FakePyPI = self.server
+        release = self.path.removeprefix("/pypi/").removesuffix("/json")
+        if release not in server.releases:
+            status, body, etag = 404, b"Not Found", None
+        else:
+            etag, data = server.releases[release]
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+            else:
+                status, body = 200, json.dumps(data).encode("utf-8")
+        server.requests.append((release, status))
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class RecordedPoetCache(PyPICache):
+    """Fetches from PyPI as usual, but replays the recorded poet output instead of running poet."""
+
+    def get_poet_output(self, version: str) -> str:
+        if self.offline:
+            return super().get_poet_output(version)
+        output = (FIXTURES_DIR / "cache" / f"poet-zev-{version}.txt").read_text(encoding="utf-8")
+        self._write(self.cache_dir / f"poet-zev-{version}.txt", output)
+        return output
+
+
+@contextmanager
+def fake_pypi() -> Iterator[FakePyPI]:
+    server = FakePyPI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url_template = generate_formula.PYPI_JSON_URL
+    generate_formula.PYPI_JSON_URL = server.url_template
+    try:
+        yield server
+    finally:
+        generate_formula.PYPI_JSON_URL = url_template
+        server.shutdown()
+        server.server_close()
+
+
+def expected_formula() -> str:
+    return (FIXTURES_DIR / f"zev-{VERSION}.rb").read_text(encoding="utf-8")
+
+
+def check_offline(directory: Path) -> None:
+    cache_dir = directory / "cache"
+    shutil.copytree(FIXTURES_DIR / "cache", cache_dir)
+    assert generate(VERSION, PyPICache(cache_dir, offline=True)) == expected_formula()
+
+
+def check_offline_missing(directory: Path) -> None:
+    try:
+        generate(VERSION, PyPICache(directory / "empty", offline=True))
+    except RuntimeError as e:
+        assert str(directory / "empty") in str(e), e
+    else:
+        raise AssertionError("an empty cache should fail offline")
+
+
+def check_etag_revalidation(directory: Path) -> None:
+    cache_dir = directory / "cache"
+    releases = {f"zev/{VERSION}"} | {f"{package}/{version}" for package, version in NATIVE_VERSIONS}
+    with fake_pypi() as server:
+        assert generate(VERSION, RecordedPoetCache(cache_dir)) == expected_formula()
+        assert sorted(server.requests) == sorted((release, 200) for release in releases), server.requests
+
+        # A second run revalidates every entry and reuses them all
+        server.requests.clear()
+        assert generate(VERSION, RecordedPoetCache(cache_dir)) == expected_formula()
+        assert sorted(server.requests) == sorted((release, 304) for release in releases), server.requests
+
+        # A changed release is fetched again and replaces the cached entry
+        data = json.loads(json.dumps(server.releases[f"zev/{VERSION}"][1]))
+        sdist = next(f for f in data["urls"] if f["filename"].endswith(".tar.gz"))
+        sdist["digests"]["sha256"] = "0" * 64
+        server.releases[f"zev/{VERSION}"] = ('"zev-0.11.1-2"', data)
+        server.requests.clear()
+        assert f'sha256 "{"0" * 64}"' in generate(VERSION, RecordedPoetCache(cache_dir))
+        assert (f"zev/{VERSION}", 200) in server.requests
+
+    # What the online runs cached is enough to build the formula offline
+    assert f'sha256 "{"0" * 64}"' in generate(VERSION, PyPICache(cache_dir, offline=True))
+
+
+if __name__ == "__main__":
+    # The wheels looked up up front are for the installed versions; pin them to the recorded ones
+    generate_formula.get_installed_native_versions = lambda: NATIVE_VERSIONS
+    for check in (check_offline, check_offline_missing, check_etag_revalidation):
+        with tempfile.TemporaryDirectory() as tmp:
+            check(Path(tmp))
+        print(f"{check.__name__}: ok")
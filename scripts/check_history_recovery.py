@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Check that a history file left damaged by a writer that died mid-line keeps working: the damaged line is moved to
+the quarantine file and every other entry, and every later write, survives.
+
+Usage:
+    pip install -e .
+    python scripts/check_history_recovery.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from zev.command_history import CommandHistory
+from zev.llms.types import Command, OptionsResponse
+
+# The start of an entry cut off inside a multibyte character: "café ↑" loses the last byte of the arrow
+TORN_LINE = b'{"query":"caf\xc3\xa9 \xe2\x86'
+
+
+def open_history(directory: Path) -> CommandHistory:
+    history = CommandHistory()
+    history.path = directory / "history"
+    history.index_path = directory / "history_index.json"
+    history.quarantine_path = directory / "history.corrupt"
+    history.path.touch(exist_ok=True)
+    return history
+
+
+def options(command: str) -> OptionsResponse:
+    return OptionsResponse(
+        commands=[Command(command=command, short_explanation="Say something", is_dangerous=False)], is_valid=True
+    )
+
+
+def queries(history: CommandHistory) -> list[str]:
+    return [header.query for header in history.iter_history()]
+
+
+def check_torn_line_then_save(directory: Path) -> None:
+    history = open_history(directory)
+    history.save_options("café menu", options("echo café"))
+    with open(history.path, "ab") as f:
+        f.write(TORN_LINE)
+
+    history.save_options("list files", options("ls"))
+    assert queries(history) == ["list files", "café menu"]
+    assert history.quarantine_path.read_bytes() == TORN_LINE + b"\n"
+    assert TORN_LINE not in history.path.read_bytes()
+    # The index still points at each entry's line
+    for stats in history.get_ranked_stats():
+        assert history.find_entry(stats.key, stats.offset).title == stats.title
+
+
+def check_torn_line_then_read(directory: Path) -> None:
+    history = open_history(directory)
+    history.save_options("café menu", options("echo café"))
+    with open(history.path, "ab") as f:
+        f.write(TORN_LINE + b"\n")
+
+    assert queries(history) == ["café menu"]
+    assert history.quarantine_path.read_bytes() == TORN_LINE + b"\n"
+    history.save_options("list files", options("ls"))
+    assert queries(history) == ["list files", "café menu"]
+
+
+def check_torn_line_then_compact(directory: Path) -> None:
+    history = open_history(directory)
+    history.save_options("café menu", options("echo café"))
+    with open(history.path, "ab") as f:
+        f.write(TORN_LINE)
+
+    history.compact()
+    assert history.quarantine_path.read_bytes() == TORN_LINE + b"\n"
+    assert queries(history) == ["café menu"]
+
+
+if __name__ == "__main__":
+    for check in (check_torn_line_then_save, check_torn_line_then_read, check_torn_line_then_compact):
+        with tempfile.TemporaryDirectory() as tmp:
+            check(Path(tmp))
+        print(f"{check.__name__}: ok")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Drive `zev --session` with scripted input and a stand-in provider, and check what each follow-up continues from.
+
+A query answered from the response cache has no response of its own on the provider's side, so a "+" follow-up to
+it must not reference the response id of whichever query the provider answered before.
+
+Usage:
+    pip install -e .
+    python scripts/check_session.py
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from zev import main
+from zev.cache.cache_backend_base import CacheBackend
+from zev.cache.response_cache import ResponseCache
+from zev.command_history import CommandHistory
+from zev.latency_stats import LatencyStats
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.types import Command, ConversationTurn, OptionsResponse
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self):
+        self.entries: dict[str, bytes] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.entries[key] = value
+
+
+class ScriptedProvider(InferenceProvider):
+    """Answers every query with one command and numbers its responses, like a provider with server-side state."""
+
+    NAME = "scripted"
+
+    def __init__(self):
+        self.model = "scripted-1"
+        self.responses = 0
+        self.calls: list[tuple[str, Optional[str]]] = []  # (query or follow-up, id of the response it continues)
+
+    def get_options(self, prompt: str, context: str) -> OptionsResponse:
+        self.calls.append((prompt, None))
+        return self._respond(prompt)
+
+    def refine_options(self, follow_up: str, context: str, turns: list[ConversationTurn]) -> OptionsResponse:
+        self.calls.append((follow_up, turns[-1].response_id))
+        return self._respond(follow_up)
+
+    def _respond(self, text: str) -> OptionsResponse:
+        self.responses += 1
+        self.last_response_id = f"resp-{self.responses}"
+        command = Command(command=f"echo {self.responses}", short_explanation=text, is_dangerous=False)
+        return OptionsResponse(commands=[command], is_valid=True)
+
+
+def run_session(inputs: list[str], provider: ScriptedProvider, cache: ResponseCache) -> None:
+    lines = iter(inputs + [""])
+    main.get_input_string = lambda *args, **kwargs: next(lines)
+    main.get_inference_provider = lambda *args, **kwargs: provider
+    main.get_response_cache = lambda: cache
+    main.show_options = lambda *args, **kwargs: None  # the user looks at the options and cancels
+    main.run_session()
+
+
+def check_follow_up_after_cache_hit() -> None:
+    provider = ScriptedProvider()
+    cache = ResponseCache(MemoryCacheBackend(), timeout=1)
+    cached = OptionsResponse(
+        commands=[Command(command="du -sh *", short_explanation="Show disk usage", is_dangerous=False)], is_valid=True
+    )
+    cache.set("show disk usage", provider.NAME, provider.model, provider.profile, cached)
+    cache.flush()
+
+    run_session(["list files", "show disk usage", "+ sorted by size", "+ in megabytes"], provider, cache)
+
+    assert provider.calls == [
+        ("list files", None),
+        # The cached answer continues nothing, rather than the "list files" response before it
+        ("sorted by size", None),
+        ("in megabytes", "resp-2"),
+    ], provider.calls
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        main.command_history = CommandHistory()
+        main.command_history.path = directory / "history"
+        main.command_history.index_path = directory / "history_index.json"
+        main.command_history.quarantine_path = directory / "history.corrupt"
+        main.command_history.path.touch()
+        main.latency_stats = LatencyStats()
+        main.latency_stats.path = directory / "latency_stats.json"
+
+        check_follow_up_after_cache_hit()
+        print("check_follow_up_after_cache_hit: ok")
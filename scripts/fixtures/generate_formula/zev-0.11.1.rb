@@ -0,0 +1,77 @@
+class Zev < Formula
+  include Language::Python::Virtualenv
+
+  desc "Lookup CLI commands easily using AI"
+  homepage "https://github.com/dtnewman/zev"
+  url "https://files.pythonhosted.org/packages/42/96/c62c1446d5c7df8d68cc8b2fb29a6fe6f91850d42b0542d34426951f/zev-0.11.1.tar.gz"
+  sha256 "4296c62c1446d5c7df8d68cc8b2fb29a6fe6f91850d42b0542d34426951f80e7"
+  license "MIT"
+  preserve_rpath
+
+  depends_on "python@3.12"
+
+  on_arm do
+    resource "jiter" do
+      url "https://files.pythonhosted.org/packages/d9/dd/757b71b1328998b78c55a1e58cb3f365e6eb7e3f708d689ea1a32433/jiter-0.9.0-cp312-cp312-macosx_11_0_arm64.whl"
+      sha256 "d9dd757b71b1328998b78c55a1e58cb3f365e6eb7e3f708d689ea1a32433e839"
+    end
+
+    resource "pydantic-core" do
+      url "https://files.pythonhosted.org/packages/20/6f/a6690faae055d8152eefd5bed3826cc6f16d7f09e0dc4a907e82bf2f/pydantic_core-2.33.1-cp312-cp312-macosx_11_0_arm64.whl"
+      sha256 "206fa6690faae055d8152eefd5bed3826cc6f16d7f09e0dc4a907e82bf2fe1be"
+    end
+  end
+
+  on_intel do
+    resource "jiter" do
+      url "https://files.pythonhosted.org/packages/13/88/16b2007c9bc15050f9474bda22725d3e54a41d6c59150c84b92e99d3/jiter-0.9.0-cp312-cp312-macosx_10_12_x86_64.whl"
+      sha256 "138816b2007c9bc15050f9474bda22725d3e54a41d6c59150c84b92e99d342ec"
+    end
+
+    resource "pydantic-core" do
+      url "https://files.pythonhosted.org/packages/62/75/ce0a1377c997ce524be7e92d955a76e845617c212253134caf090bc5/pydantic_core-2.33.1-cp312-cp312-macosx_10_12_x86_64.whl"
+      sha256 "6275ce0a1377c997ce524be7e92d955a76e845617c212253134caf090bc58440"
+    end
+  end
+
+  resource "annotated-types" do
+    url "https://files.pythonhosted.org/packages/82/94/499fe67ce18ca0b9cc5c20954a8609ce859a064e00f031bfacd2723a/annotated_types-0.7.0.tar.gz"
+    sha256 "8294499fe67ce18ca0b9cc5c20954a8609ce859a064e00f031bfacd2723ab666"
+  end
+
+  resource "pydantic" do
+    url "https://files.pythonhosted.org/packages/12/d8/c1e0ffb38220dbf8d897b97832830fa55bc374460f752211a3bced34/pydantic-2.11.3.tar.gz"
+    sha256 "12d8c1e0ffb38220dbf8d897b97832830fa55bc374460f752211a3bced34c06a"
+  end
+
+  resource "rich" do
+    url "https://files.pythonhosted.org/packages/10/1c/37d585816509507b55349dad6dc96fe2eaa8fa4e4bfa90d05e97f4e8/rich-14.0.0.tar.gz"
+    sha256 "101c37d585816509507b55349dad6dc96fe2eaa8fa4e4bfa90d05e97f4e84e8b"
+  end
+
+  def install_resource(venv, resource)
+    if resource.url&.end_with?(".whl")
+      wheel_dir = buildpath/"homebrew-wheels"
+      wheel_dir.mkpath
+      wheel_name = resource.url.to_s.split("/").last
+      wheel_path = wheel_dir/wheel_name
+      FileUtils.cp(resource.cached_download, wheel_path)
+      system "python3.12", "-m", "pip", "--python=#{venv.root}/bin/python", "install",
+             "--verbose", "--no-deps", "--ignore-installed", "--no-compile", wheel_path
+    else
+      venv.pip_install resource
+    end
+  end
+
+  def install
+    venv = virtualenv_create(libexec, "python3.12")
+    resources.each { |r| install_resource(venv, r) }
+    venv.pip_install_and_link buildpath
+  end
+
+  test do
+    (testpath/".zevrc").write("LLM_PROVIDER=openai\nOPENAI_API_KEY=test\n")
+    output = shell_output("HOME=\#{testpath} \#{bin}/zev --version")
+    assert_match "zev version", output
+  end
+end
@@ -3,44 +3,126 @@
 Generate a Homebrew formula for zev by fetching metadata from PyPI
 and running homebrew-pypi-poet to collect dependency resources.
 
+PyPI metadata is fetched in parallel with poet, and kept in an on-disk cache
+keyed by package and version (revalidated with ETags). Poet's output is
+recorded in the same cache, so --offline can rebuild a formula from the cache
+alone, e.g. from the recorded fixtures in scripts/fixtures/generate_formula
+(see scripts/check_generate_formula.py).
+
 Usage:
     pip install homebrew-pypi-poet
     pip install zev==<version>
-    python scripts/generate_formula.py <version>
+    python scripts/generate_formula.py <version> [--offline] [--cache-dir DIR]
 """
 
+import argparse
 import json
+import os
 import re
 import subprocess
 import sys
+import tempfile
+import urllib.error
 import urllib.request
-
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as installed_version
+from pathlib import Path
 
 # Packages that require native compilation (Rust/C) — use binary wheels to avoid toolchain deps.
 NATIVE_PACKAGES = {"jiter", "pydantic-core"}
 ARM64_TAG = "macosx_11_0_arm64"
 X86_64_TAG = "macosx_10_12_x86_64"
 
+PYPI_JSON_URL = "https://pypi.org/pypi/{package}/{version}/json"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "zev-formula"
+FETCH_WORKERS = 8
+FETCH_TIMEOUT_SECONDS = 30
+
 
 def normalize_package_name(name: str) -> str:
     return name.replace("_", "-").lower()
 
 
-def get_pypi_tarball(version: str) -> tuple[str, str]:
-    url = f"https://pypi.org/pypi/zev/{version}/json"
-    with urllib.request.urlopen(url) as resp:
-        data = json.load(resp)
+class PyPICache:
+    """
+    PyPI JSON metadata and poet output, stored in cache_dir. Cached metadata is
+    revalidated with its ETag; offline, only what's already cached is used.
+    """
+
+    def __init__(self, cache_dir: Path, offline: bool = False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_json(self, package: str, version: str) -> dict:
+        package = normalize_package_name(package)
+        path = self.cache_dir / f"{package}-{version}.json"
+        cached = self._read_json(path)
+        if self.offline:
+            if cached is None:
+                raise RuntimeError(
+                    f"{package} {version} is not cached in {self.cache_dir}; run without --offline first"
+                )
+            return cached["data"]
+
+        headers = {"Accept": "application/json"}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        request = urllib.request.Request(PYPI_JSON_URL.format(package=package, version=version), headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT_SECONDS) as resp:
+                data = json.load(resp)
+                etag = resp.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached:
+                return cached["data"]
+            raise
+        self._write(path, json.dumps({"etag": etag, "data": data}))
+        return data
+
+    def get_poet_output(self, version: str) -> str:
+        path = self.cache_dir / f"poet-zev-{version}.txt"
+        if self.offline:
+            if not path.exists():
+                raise RuntimeError(f"No recorded poet output for zev {version} in {self.cache_dir}")
+            return path.read_text(encoding="utf-8")
+
+        result = subprocess.run(
+            [sys.executable, "-m", "poet", "zev"],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"poet failed: {result.stderr}")
+        self._write(path, result.stdout)
+        return result.stdout
+
+    def _read_json(self, path: Path):
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, path: Path, text: str) -> None:
+        # Write to a temporary file first so an interrupted run never leaves a truncated cache entry
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=path.name, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def get_pypi_tarball(cache: PyPICache, version: str) -> tuple[str, str]:
+    data = cache.get_json("zev", version)
     for f in data["urls"]:
         if f["filename"].endswith(".tar.gz"):
             return f["url"], f["digests"]["sha256"]
     raise RuntimeError(f"No source tarball found for zev {version}")
 
 
-def get_wheel_urls(package: str, version: str) -> dict[str, tuple[str, str]]:
+def get_wheel_urls(cache: PyPICache, package: str, version: str) -> dict[str, tuple[str, str]]:
     """Return {platform_tag: (url, sha256)} for cp312 macOS wheels of a package."""
-    url = f"https://pypi.org/pypi/{normalize_package_name(package)}/{version}/json"
-    with urllib.request.urlopen(url) as resp:
-        data = json.load(resp)
+    data = cache.get_json(package, version)
     result: dict[str, tuple[str, str]] = {}
     for f in data["urls"]:
         fn = f["filename"]
@@ -66,7 +148,7 @@ def parse_poet_output(output: str) -> list[dict]:
             while i < len(lines):
                 line = lines[i]
                 # Strip the common leading indent introduced by poet
-                normalized = line[len(leading):] if line.startswith(leading) else line.lstrip()
+                normalized = line[len(leading) :] if line.startswith(leading) else line.lstrip()
                 block_lines.append(normalized)
                 if line.strip() == "end":
                     i += 1
@@ -75,7 +157,7 @@ def parse_poet_output(output: str) -> list[dict]:
             block_str = "\n".join(block_lines)
             url_m = re.search(r'url "([^"]+)"', block_str)
             url = url_m.group(1) if url_m else ""
-            ver_m = re.search(r'[/_-](\d+\.\d+[\d.]*)(?:\.tar\.gz|[-_.])', url)
+            ver_m = re.search(r"[/_-](\d+\.\d+[\d.]*)(?:\.tar\.gz|[-_.])", url)
             version = ver_m.group(1) if ver_m else ""
             resources.append({"name": name, "url": url, "version": version, "block": block_str})
         else:
@@ -83,16 +165,21 @@ def parse_poet_output(output: str) -> list[dict]:
     return resources
 
 
-def get_poet_resources() -> str:
-    result = subprocess.run(
-        [sys.executable, "-m", "poet", "zev"],
-        capture_output=True,
-        text=True,
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"poet failed: {result.stderr}")
+def get_installed_native_versions() -> list[tuple[str, str]]:
+    """Versions of the native packages installed alongside zev, which are the ones poet will pick."""
+    versions = []
+    for package in sorted(NATIVE_PACKAGES):
+        try:
+            versions.append((package, installed_version(package)))
+        except PackageNotFoundError:
+            pass
+    return versions
+
 
-    all_resources = parse_poet_output(result.stdout)
+def get_poet_resources(
+    cache: PyPICache, poet_output: str, pool: ThreadPoolExecutor, wheel_futures: dict[tuple[str, str], Future]
+) -> str:
+    all_resources = parse_poet_output(poet_output)
     # Drop the zev package itself
     all_resources = [r for r in all_resources if r["name"] != "zev"]
 
@@ -102,19 +189,21 @@ def get_poet_resources() -> str:
     sections: list[str] = []
 
     if native:
-        # Fetch binary wheel URLs once per native package
-        wheel_cache: dict[str, dict[str, tuple[str, str]]] = {}
+        # Wheels for the installed versions are usually already fetched; fetch any others poet picked
         for res in native:
-            wheel_cache[res["name"]] = get_wheel_urls(res["name"], res["version"])
+            key = (normalize_package_name(res["name"]), res["version"])
+            if key not in wheel_futures:
+                wheel_futures[key] = pool.submit(get_wheel_urls, cache, *key)
+        wheel_cache: dict[str, dict[str, tuple[str, str]]] = {
+            res["name"]: wheel_futures[(normalize_package_name(res["name"]), res["version"])].result() for res in native
+        }
 
         def make_arch_block(arch_name: str, platform_tag: str) -> str:
             lines = [f"on_{arch_name} do"]
             for i, res in enumerate(native):
                 wheels = wheel_cache[res["name"]]
                 if platform_tag not in wheels:
-                    raise RuntimeError(
-                        f"No cp312 wheel for {res['name']} {res['version']} on {platform_tag}"
-                    )
+                    raise RuntimeError(f"No cp312 wheel for {res['name']} {res['version']} on {platform_tag}")
                 whl_url, whl_sha = wheels[platform_tag]
                 lines.append(f'  resource "{res["name"]}" do')
                 lines.append(f'    url "{whl_url}"')
@@ -144,9 +233,17 @@ def indent(text: str, spaces: int = 2) -> str:
     return "\n".join(pad + line if line.strip() else line for line in text.splitlines())
 
 
-def generate(version: str) -> str:
-    tarball_url, sha256 = get_pypi_tarball(version)
-    resources = get_poet_resources()
+def generate(version: str, cache: PyPICache) -> str:
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        # poet resolves dependencies while the metadata is fetched
+        poet_output = pool.submit(cache.get_poet_output, version)
+        tarball = pool.submit(get_pypi_tarball, cache, version)
+        wheel_futures = {
+            (package, package_version): pool.submit(get_wheel_urls, cache, package, package_version)
+            for package, package_version in get_installed_native_versions()
+        }
+        resources = get_poet_resources(cache, poet_output.result(), pool, wheel_futures)
+        tarball_url, sha256 = tarball.result()
 
     return f"""\
 class Zev < Formula
@@ -193,7 +290,9 @@ end
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <version>", file=sys.stderr)
-        sys.exit(1)
-    print(generate(sys.argv[1]))
+    parser = argparse.ArgumentParser(description="Generate the Homebrew formula for a zev release.")
+    parser.add_argument("version")
+    parser.add_argument("--offline", action="store_true", help="build the formula from the cache only")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help=f"default: {DEFAULT_CACHE_DIR}")
+    args = parser.parse_args()
+    print(generate(args.version, PyPICache(args.cache_dir, offline=args.offline)))
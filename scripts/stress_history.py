@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Hammer one history file from many zev processes at once, then check that nothing was lost or torn.
+
+Each worker process appends entries, reads the history back and sometimes compacts it. Afterwards the log
+must contain only whole, valid lines with no duplicate queries, nothing may have been quarantined, and the index must
+agree with the log: the same keys, offsets that point at each entry's line, and (when nothing was trimmed) one
+use per write.
+
+Usage:
+    pip install -e .
+    python scripts/stress_history.py [--processes 200] [--writes 3] [--max-entries 100]
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from zev.command_history import CommandHistory, CommandHistoryHeader
+from zev.llms.types import Command, OptionsResponse
+
+
+def open_history(directory: Path, max_entries: int) -> CommandHistory:
+    history = CommandHistory()
+    history.path = directory / "history"
+    history.index_path = directory / "history_index.json"
+    history.quarantine_path = directory / "history.corrupt"
+    history.max_entries = max_entries
+    history.path.touch(exist_ok=True)
+    return history
+
+
+def run_worker(directory: Path, worker: int, writes: int, max_entries: int) -> None:
+    history = open_history(directory, max_entries)
+    options = OptionsResponse(
+        commands=[Command(command=f"echo {worker}", short_explanation="Print the worker number", is_dangerous=False)],
+        is_valid=True,
+    )
+    for i in range(writes):
+        history.save_options(f"stress worker {worker} write {i}", options)
+        # Reading while others write is what would surface a torn line: it would be quarantined
+        for _ in zip(range(5), history.iter_history()):
+            pass
+        if random.random() < 0.1:
+            history.compact()
+
+
+def check(directory: Path, processes: int, writes: int, max_entries: int) -> list[str]:
+    history = open_history(directory, max_entries)
+    problems = []
+    data = history.path.read_bytes()
+    lines = data.splitlines(keepends=True)
+    if lines and not lines[-1].endswith(b"\n"):
+        problems.append("the log ends with a partial line")
+
+    keys = []
+    offsets = {}
+    position = 0
+    for line in lines:
+        try:
+            key = CommandHistoryHeader.from_json(line).key
+        except ValueError:
+            problems.append(f"unreadable line at offset {position}")
+        else:
+            keys.append(key)
+            offsets[key] = position
+        position += len(line)
+
+    if history.quarantine_path.exists() and history.quarantine_path.stat().st_size:
+        problems.append("lines were quarantined while reading")
+    if len(keys) != len(set(keys)):
+        problems.append(f"{len(keys) - len(set(keys))} duplicate entries in the log")
+    expected = min(processes * writes, max_entries)
+    if len(set(keys)) != expected:
+        problems.append(f"{len(set(keys))} entries in the log, expected {expected}")
+
+    index = history._read_index()
+    if index is None:
+        return problems + ["the index is missing or unreadable"]
+    if set(index.entries) != set(keys):
+        problems.append(
+            f"index and log disagree: {len(set(index.entries) - set(keys))} keys only in the index, "
+            f"{len(set(keys) - set(index.entries))} only in the log"
+        )
+    stale = [key for key, stats in index.entries.items() if key in offsets and stats.offset != offsets[key]]
+    if stale:
+        problems.append(f"{len(stale)} index offsets don't point at their entry")
+    if processes * writes <= max_entries:
+        uses = sum(stats.uses for stats in index.entries.values())
+        if uses != processes * writes:
+            problems.append(f"{uses} uses recorded, expected {processes * writes}")
+    return problems
+
+
+def stress(processes: int, writes: int, max_entries: int) -> list[str]:
+    with tempfile.TemporaryDirectory() as directory:
+        workers = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--worker", str(worker), directory, str(writes), str(max_entries)]
+            )
+            for worker in range(processes)
+        ]
+        failed = sum(worker.wait() != 0 for worker in workers)
+        problems = [f"{failed} worker processes failed"] if failed else []
+        return problems + check(Path(directory), processes, writes, max_entries)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        run_worker(Path(sys.argv[3]), int(sys.argv[2]), int(sys.argv[4]), int(sys.argv[5]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=3)
+    parser.add_argument("--max-entries", type=int, default=100, help="history size; smaller than the total trims")
+    args = parser.parse_args()
+
+    failed = False
+    # Once with room for every entry, once with trimming on almost every write
+    for max_entries in (args.processes * args.writes, args.max_entries):
+        problems = stress(args.processes, args.writes, max_entries)
+        label = f"{args.processes} processes x {args.writes} writes, max {max_entries} entries"
+        print(f"{label}: {'ok' if not problems else '; '.join(problems)}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,15 @@
+from typing import Optional
+
+
+class CacheBackend:
+    # Shared backends are visible to other machines, so entries go through the redaction hook before upload
+    SHARED = False
+
+    def __init__(self):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError("Subclasses must implement this method")
@@ -0,0 +1,42 @@
+import os
+import time
+from typing import Optional
+
+from zev.cache.cache_backend_base import CacheBackend
+from zev.file_utils import atomic_write_lines
+from zev.paths import get_response_cache_dir
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    Stores one file per key in the app dir. Expiry is enforced by `ResponseCache` when entries are read; each
+    file's mtime is set to when it expires, so `evict_expired` can clean up without reading any of them.
+    """
+
+    def __init__(self):
+        self.path = get_response_cache_dir()
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return (self.path / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        path = self.path / key
+        atomic_write_lines(path, [value.decode("utf-8")])
+        expires_at = time.time() + ttl
+        os.utime(path, (expires_at, expires_at))
+
+    def evict_expired(self) -> int:
+        """Delete expired entries, returning how many were deleted."""
+        now = time.time()
+        evicted = 0
+        for entry in os.scandir(self.path):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < now:
+                    os.unlink(entry.path)
+                    evicted += 1
+            except FileNotFoundError:
+                pass  # another process evicted or replaced it first
+        return evicted
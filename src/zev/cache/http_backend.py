@@ -0,0 +1,37 @@
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from zev.cache.cache_backend_base import CacheBackend
+
+
+class HttpCacheBackend(CacheBackend):
+    """
+    A plain HTTP key-value store: entries are read with `GET {url}/{key}` (404 means a miss) and written with
+    `PUT {url}/{key}`. The TTL is passed in the `X-TTL-Seconds` header for servers that can expire entries.
+    """
+
+    SHARED = True
+
+    def __init__(self, url: str, timeout: float, auth_token: Optional[str] = None):
+        if not url:
+            raise ValueError("CACHE_URL must be set when CACHE_BACKEND is http.")
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {auth_token}"} if auth_token else {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        request = urllib.request.Request(f"{self.url}/{key}", headers=self.headers, method="GET")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        headers = {**self.headers, "Content-Type": "application/json", "X-TTL-Seconds": str(ttl)}
+        request = urllib.request.Request(f"{self.url}/{key}", data=value, headers=headers, method="PUT")
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
@@ -0,0 +1,71 @@
+import socket
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+from zev.cache.cache_backend_base import CacheBackend
+
+DEFAULT_REDIS_PORT = 6379
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Talks the Redis protocol (RESP) directly over a socket, so any Redis-compatible server works without
+    pulling in a client library. Only the handful of commands needed for GET / SET with expiry are used.
+    """
+
+    SHARED = True
+
+    def __init__(self, url: str, timeout: float):
+        if not url:
+            raise ValueError("CACHE_URL must be set when CACHE_BACKEND is redis (e.g. redis://localhost:6379/0).")
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or DEFAULT_REDIS_PORT
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = parsed.path.lstrip("/") or None
+        self.timeout = timeout
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._execute([b"GET", key.encode()])
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._execute([b"SET", key.encode(), value, b"EX", str(ttl).encode()])
+
+    def _execute(self, command: list[bytes]):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            reader = sock.makefile("rb")
+            if self.password:
+                username = [self.username.encode()] if self.username else []
+                self._send(sock, reader, [b"AUTH", *username, self.password.encode()])
+            if self.db:
+                self._send(sock, reader, [b"SELECT", self.db.encode()])
+            return self._send(sock, reader, command)
+
+    def _send(self, sock: socket.socket, reader, command: list[bytes]):
+        payload = b"*%d\r\n" % len(command)
+        for part in command:
+            payload += b"$%d\r\n%s\r\n" % (len(part), part)
+        sock.sendall(payload)
+        return self._read_reply(reader)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise ConnectionError(f"Redis error: {rest.decode(errors='replace')}")
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length == -1:
+                return None
+            return reader.read(length + 2)[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length == -1 else [self._read_reply(reader) for _ in range(length)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
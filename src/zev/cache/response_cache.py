@@ -0,0 +1,172 @@
+import hashlib
+import importlib
+import json
+import os
+import platform
+import threading
+import time
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+
+from zev.cache.cache_backend_base import CacheBackend
+from zev.config import config
+from zev.constants import (
+    CACHE_DEFAULT_NEGATIVE_TTL,
+    CACHE_DEFAULT_TIMEOUT_MS,
+    CACHE_DEFAULT_TTL,
+    PROMPT,
+    CacheBackends,
+)
+from zev.llms.types import OptionsResponse
+from zev.query import canonical_key
+
+# Bump when the cached payload or key format changes so old entries are ignored
+CACHE_KEY_VERSION = 4
+
+
+def get_env_fingerprint() -> str:
+    """A coarse description of the environment, so answers are only shared between similar setups."""
+    shell = os.environ.get("SHELL") or os.environ.get("COMSPEC") or ""
+    return f"{platform.system()}/{os.path.basename(shell)}"
+
+
+def get_prompt_fingerprint() -> str:
+    """Changes whenever the prompt or the response schema does, so answers to an older prompt aren't reused."""
+    schema = json.dumps(OptionsResponse.model_json_schema(), sort_keys=True)
+    return hashlib.sha256((PROMPT + schema).encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    Caches provider responses in a `CacheBackend`. Every backend call runs within a latency budget, so a
+    slow or unreachable store behaves like a miss instead of delaying the query.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: int = CACHE_DEFAULT_TTL,
+        negative_ttl: int = CACHE_DEFAULT_NEGATIVE_TTL,
+        timeout: float = CACHE_DEFAULT_TIMEOUT_MS / 1000,
+        redact: Optional[Callable[[OptionsResponse], Optional[OptionsResponse]]] = None,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.redact = redact
+        self._pending_writes: list[threading.Thread] = []
+
+    def make_key(self, query: str, provider: str, model: str, profile: str) -> str:
+        parts = [
+            CACHE_KEY_VERSION,
+            provider,
+            model,
+            profile,
+            get_prompt_fingerprint(),
+            get_env_fingerprint(),
+            canonical_key(query),
+        ]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get(self, query: str, provider: str, model: str, profile: str) -> Optional[OptionsResponse]:
+        key = self.make_key(query, provider, model, profile)
+        raw = self._run_within_budget(lambda: self.backend.get(key))
+        if not raw:
+            return None
+        try:
+            payload = json.loads(raw)
+            if payload["expires_at"] < time.time():
+                return None
+            return OptionsResponse.model_validate(payload["response"])
+        except (ValueError, KeyError, TypeError, ValidationError):
+            return None
+
+    def set(self, query: str, provider: str, model: str, profile: str, response: OptionsResponse) -> None:
+        """Store a response in the background. Invalid responses are kept too, but for a shorter time."""
+        if self.backend.SHARED and self.redact:
+            response = self.redact(response)
+            if response is None:
+                return
+
+        ttl = self.ttl if response.is_valid else self.negative_ttl
+        payload = json.dumps({"expires_at": time.time() + ttl, "response": response.model_dump()}).encode("utf-8")
+        key = self.make_key(query, provider, model, profile)
+
+        def _write():
+            try:
+                self.backend.set(key, payload, ttl)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=_write, daemon=True)
+        thread.start()
+        self._pending_writes.append(thread)
+
+    def flush(self) -> None:
+        """Give pending writes up to one latency budget to finish before the process exits."""
+        deadline = time.monotonic() + self.timeout
+        for thread in self._pending_writes:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._pending_writes = []
+
+    def _run_within_budget(self, fn: Callable):
+        result = []
+
+        def _run():
+            try:
+                result.append(fn())
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        return result[0] if result else None
+
+
+def _load_redact_hook(path: Optional[str]) -> Optional[Callable]:
+    if not path:
+        return None
+    module_name, _, function_name = path.partition(":")
+    if not function_name:
+        raise ValueError("CACHE_REDACT_HOOK must look like `module.path:function_name`.")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _int_setting(value: Optional[int], default: int) -> int:
+    return default if value is None else value
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    backend_name = config.cache_backend or CacheBackends.NONE
+    timeout = _int_setting(config.cache_timeout_ms, CACHE_DEFAULT_TIMEOUT_MS) / 1000
+
+    if backend_name == CacheBackends.NONE:
+        return None
+    elif backend_name == CacheBackends.FILE:
+        # pylint: disable=import-outside-toplevel
+        from zev.cache.file_backend import FileCacheBackend
+
+        backend = FileCacheBackend()
+    elif backend_name == CacheBackends.REDIS:
+        # pylint: disable=import-outside-toplevel
+        from zev.cache.redis_backend import RedisCacheBackend
+
+        backend = RedisCacheBackend(config.cache_url, timeout=timeout)
+    elif backend_name == CacheBackends.HTTP:
+        # pylint: disable=import-outside-toplevel
+        from zev.cache.http_backend import HttpCacheBackend
+
+        backend = HttpCacheBackend(config.cache_url, timeout=timeout, auth_token=config.cache_auth_token)
+    else:
+        raise ValueError(f"Invalid cache backend: {backend_name}")
+
+    return ResponseCache(
+        backend,
+        ttl=_int_setting(config.cache_ttl_seconds, CACHE_DEFAULT_TTL),
+        negative_ttl=_int_setting(config.cache_negative_ttl_seconds, CACHE_DEFAULT_NEGATIVE_TTL),
+        timeout=timeout,
+        redact=_load_redact_hook(config.cache_redact_hook),
+    )
@@ -1,54 +1,460 @@
-from typing import Optional
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterator, Optional
 
 import questionary
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing_extensions import NotRequired, TypedDict
 
+from zev.command_runner import CommandRun
 from zev.command_selector import show_options
-from zev.llms.types import OptionsResponse
-from zev.paths import get_history_path
+from zev.file_utils import atomic_write_lines, file_lock, iter_lines_reversed
+from zev.llms.types import Command, OptionsResponse
+from zev.paths import get_history_index_path, get_history_path, get_history_quarantine_path
+from zev.query import canonical_key
+from zev.ranking import get_tool
 
+# A use counts half as much for ranking after this long
+FRECENCY_HALF_LIFE = 14 * 86400
+# Bump when entry keys are computed differently; older indexes are re-keyed from their titles when read
+HISTORY_INDEX_VERSION = 3
+# How much of a command's output is kept with its last run
+RUN_OUTPUT_HISTORY_CHARS = 2000
 
-class CommandHistoryEntry(BaseModel):
+
+class _Titled:
+    __slots__ = ()
+
+    @property
+    def title(self) -> str:
+        if not self.refinements:
+            return self.query
+        return f"{self.query} → " + " → ".join(self.refinements)
+
+    @property
+    def key(self) -> str:
+        """Entries with the same key are the same query, asked again."""
+        return canonical_key(self.title)
+
+
+class CommandHistoryEntry(_Titled, BaseModel):
     query: str
+    refinements: list[str] = []  # follow-ups that led from the original query to this response
     response: OptionsResponse
 
 
+class _HeaderFields(TypedDict):
+    query: str
+    refinements: NotRequired[list[str]]
+
+
+class _RunFields(TypedDict):
+    exit_code: int
+    duration: float
+    ran_at: float
+    output: str
+    truncated: bool
+
+
+class _StatsFields(TypedDict):
+    key: str
+    title: str
+    uses: int
+    last_used: float
+    frecency: float
+    selected: dict[str, int]
+    runs: NotRequired[dict[str, _RunFields]]
+    offset: NotRequired[Optional[int]]
+
+
+class _IndexFields(TypedDict):
+    version: NotRequired[int]
+    entries: dict[str, _StatsFields]
+
+
+# Built once at import. Parsing into plain dicts skips model construction, and the header adapter ignores the
+# response, so listing history never validates the commands in it.
+_HEADER_ADAPTER = TypeAdapter(_HeaderFields)
+_INDEX_ADAPTER = TypeAdapter(_IndexFields)
+
+
+class CommandHistoryHeader(_Titled):
+    """
+    The parts of a history entry needed to list it. This is a slotted class rather than a model because one is
+    built per line read; the response is only parsed and validated by `load`.
+    """
+
+    __slots__ = ("query", "refinements", "_raw")
+
+    def __init__(self, query: str, refinements: Optional[list[str]] = None, raw: bytes = b"") -> None:
+        self.query = query
+        self.refinements = refinements or []
+        self._raw = raw
+
+    @classmethod
+    def from_json(cls, line: bytes) -> "CommandHistoryHeader":
+        fields = _HEADER_ADAPTER.validate_json(line)
+        return cls(fields["query"], fields.get("refinements"), raw=line)
+
+    def load(self) -> CommandHistoryEntry:
+        return CommandHistoryEntry.model_validate_json(self._raw)
+
+
+class CommandHistoryStats:
+    """Usage counters for one deduplicated history entry."""
+
+    __slots__ = ("key", "title", "uses", "last_used", "frecency", "selected", "runs", "offset")
+
+    def __init__(
+        self,
+        key: str,
+        title: str,
+        uses: int = 0,
+        last_used: float = 0,
+        frecency: float = 0,
+        selected: Optional[dict[str, int]] = None,
+        runs: Optional[dict[str, _RunFields]] = None,
+        offset: Optional[int] = None,
+    ) -> None:
+        self.key = key
+        self.title = title
+        self.uses = uses
+        self.last_used = last_used
+        self.frecency = frecency  # decayed use count as of `last_used`
+        self.selected = selected or {}  # how often each command was picked
+        self.runs = runs or {}  # the last run of each command the user ran from zev
+        self.offset = offset  # where the newest line for this entry starts in the log, if known
+
+    def score(self, now: float) -> float:
+        return self.frecency * 0.5 ** ((now - self.last_used) / FRECENCY_HALF_LIFE)
+
+    def record_use(self, now: float) -> None:
+        self.frecency = self.score(now) + 1
+        self.uses += 1
+        self.last_used = now
+
+    def merge(self, other: "CommandHistoryStats") -> None:
+        """Fold in the counters of an entry that turned out to be the same query."""
+        now = max(self.last_used, other.last_used)
+        if other.last_used > self.last_used:
+            self.title, self.offset = other.title, other.offset
+        self.frecency = self.score(now) + other.score(now)
+        self.uses += other.uses
+        self.last_used = now
+        for command, picks in other.selected.items():
+            self.selected[command] = self.selected.get(command, 0) + picks
+        for command, run in other.runs.items():
+            if command not in self.runs or run["ran_at"] > self.runs[command]["ran_at"]:
+                self.runs[command] = run
+
+    def last_run(self) -> Optional[_RunFields]:
+        return max(self.runs.values(), key=lambda run: run["ran_at"], default=None)
+
+    def to_fields(self) -> _StatsFields:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CommandHistoryIndex:
+    """Counters for every entry in the history log, updated as entries are added so listing never reads the log."""
+
+    __slots__ = ("entries",)
+
+    def __init__(self, entries: Optional[dict[str, CommandHistoryStats]] = None) -> None:
+        self.entries = entries or {}
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "CommandHistoryIndex":
+        fields = _INDEX_ADAPTER.validate_json(data)
+        index = cls({key: CommandHistoryStats(**stats) for key, stats in fields["entries"].items()})
+        if fields.get("version", 1) != HISTORY_INDEX_VERSION:
+            index = index.rekeyed()
+        return index
+
+    def rekeyed(self) -> "CommandHistoryIndex":
+        """The same entries under keys computed the current way. Entries that now share a key are merged."""
+        entries: dict[str, CommandHistoryStats] = {}
+        for stats in self.entries.values():
+            stats.key = canonical_key(stats.title)
+            if stats.key in entries:
+                entries[stats.key].merge(stats)
+            else:
+                entries[stats.key] = stats
+        return CommandHistoryIndex(entries)
+
+    def to_json(self) -> str:
+        fields = {
+            "version": HISTORY_INDEX_VERSION,
+            "entries": {key: stats.to_fields() for key, stats in self.entries.items()},
+        }
+        return _INDEX_ADAPTER.dump_json(fields).decode("utf-8")
+
+
 class CommandHistory:
     def __init__(self) -> None:
         self.path = get_history_path()
+        self.index_path = get_history_index_path()
+        self.quarantine_path = get_history_quarantine_path()
         self.max_entries = 100
         self.path.touch(exist_ok=True)
         self.encoding = "utf-8"
+        # A writer that died mid-line can leave half a character behind. Undecodable bytes are carried through as
+        # surrogates, so such a line is quarantined like any other unreadable line and written back byte for byte.
+        self.encoding_errors = "surrogateescape"
+
+    def save_options(
+        self, query: str, options: OptionsResponse, refinements: Optional[list[str]] = None, new_use: bool = True
+    ) -> None:
+        """Add an entry to the log. Pass `new_use=False` when updating the options of a query just asked."""
+        entry = CommandHistoryEntry(query=query, response=options, refinements=refinements or [])
+        self._write_to_history_file(entry, new_use=new_use)
+
+    def record_selection(self, query: str, command: Command, refinements: Optional[list[str]] = None) -> None:
+        """Remember which of an entry's commands the user picked."""
+        with self._update_stats(query, refinements) as stats:
+            if stats is not None:
+                stats.selected[command.command] = stats.selected.get(command.command, 0) + 1
+
+    def record_run(
+        self, query: str, command: Command, run: CommandRun, refinements: Optional[list[str]] = None
+    ) -> None:
+        """Remember how the last run of one of an entry's commands went."""
+        with self._update_stats(query, refinements) as stats:
+            if stats is not None:
+                stats.runs[command.command] = {
+                    "exit_code": run.exit_code,
+                    "duration": round(run.duration, 3),
+                    "ran_at": time.time(),
+                    "output": run.output[-RUN_OUTPUT_HISTORY_CHARS:],
+                    "truncated": run.truncated or len(run.output) > RUN_OUTPUT_HISTORY_CHARS,
+                }
+
+    @contextmanager
+    def _update_stats(self, query: str, refinements: Optional[list[str]]) -> Iterator[Optional[CommandHistoryStats]]:
+        """Yield the stats for an entry (None if it isn't in the index) and save any changes made to them."""
+        key = CommandHistoryHeader(query, refinements).key
+        with file_lock(self.path):
+            index = self._load_index()
+            stats = index.entries.get(key)
+            yield stats
+            if stats is not None:
+                self._write_index(index)
+
+    def _record_use(self, key: str) -> None:
+        with file_lock(self.path):
+            index = self._load_index()
+            if key in index.entries:
+                index.entries[key].record_use(time.time())
+                self._write_index(index)
+
+    def _forget(self, key: str) -> None:
+        with file_lock(self.path):
+            index = self._load_index()
+            if index.entries.pop(key, None):
+                self._write_index(index)
+
+    def get_ranked_stats(self) -> list[CommandHistoryStats]:
+        """One item per distinct query, most frecent first."""
+        with file_lock(self.path, shared=True):
+            index = self._read_index()
+        if index is None:
+            with file_lock(self.path):
+                index = self._load_index()
+        now = time.time()
+        return sorted(index.entries.values(), key=lambda stats: stats.score(now), reverse=True)
+
+    def get_tool_counts(self) -> Counter:
+        """How often the user has picked each tool (a command's first word)."""
+        with file_lock(self.path, shared=True):
+            index = self._read_index() or CommandHistoryIndex()
+        counts = Counter()
+        for stats in index.entries.values():
+            for command, picks in stats.selected.items():
+                counts[get_tool(command)] += picks
+        return counts
+
+    def find_entry(self, key: str, offset: Optional[int] = None) -> Optional[CommandHistoryHeader]:
+        """
+        Find the most recent entry with this key, or None if it's no longer in the log. A known offset is tried
+        first; if the log was rewritten since, it's found by reading backwards instead.
+        """
+        if offset is not None:
+            with file_lock(self.path, shared=True):
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    line = f.readline().rstrip(b"\r\n")
+            try:
+                header = CommandHistoryHeader.from_json(line)
+            except ValidationError:
+                header = None
+            if header is not None and header.key == key:
+                return header
+
+        history_entries = self.iter_history()
+        try:
+            for header in history_entries:
+                if header.key == key:
+                    return header
+        finally:
+            history_entries.close()
+        return None
+
+    def iter_history(self) -> Iterator[CommandHistoryHeader]:
+        """Yield history entries newest-first, reading the file backwards so only what's shown gets read."""
+        with file_lock(self.path, shared=True):
+            f = open(self.path, "rb")
+            # Anything past this point was appended after we started; compaction replaces the file rather
+            # than rewriting it in place, so the open handle keeps seeing a consistent snapshot
+            end = os.fstat(f.fileno()).st_size
+
+        malformed = []
+        try:
+            for line in iter_lines_reversed(f, end):
+                try:
+                    header = CommandHistoryHeader.from_json(line)
+                except ValidationError:
+                    malformed.append(line.decode(self.encoding, self.encoding_errors))
+                    continue
+                yield header
+        finally:
+            f.close()
+            if malformed:
+                self._quarantine_lines(malformed)
+
+    def _write_to_history_file(self, new_entry: CommandHistoryEntry, new_use: bool = True) -> None:
+        new_line = new_entry.model_dump_json() + "\n"
+
+        # Other zev processes may be writing at the same time, so the read-modify-write is done under a lock
+        with file_lock(self.path):
+            index = self._load_index()
+            with open(self.path, "r", encoding=self.encoding, errors=self.encoding_errors) as f:
+                lines = f.readlines()
+
+            # A previous writer may have died mid-line; don't glue the new entry onto the partial line
+            needs_repair = bool(lines) and not lines[-1].endswith("\n")
+
+            if len(lines) + 1 > self.max_entries or needs_repair:
+                if needs_repair:
+                    lines[-1] += "\n"
+                lines.append(new_line)
+                offsets = self._rewrite(lines, index)
+            else:
+                with open(self.path, "a", encoding=self.encoding, errors=self.encoding_errors) as f:
+                    f.write(new_line)
+                    offsets = {new_entry.key: f.tell() - len(new_line.encode(self.encoding, self.encoding_errors))}
+
+            stats = index.entries.setdefault(new_entry.key, CommandHistoryStats(new_entry.key, new_entry.title))
+            stats.title = new_entry.title
+            stats.offset = offsets[new_entry.key]
+            if new_use or not stats.uses:
+                stats.record_use(time.time())
+            self._write_index(index)
 
-    def save_options(self, query: str, options: OptionsResponse) -> None:
-        entry = CommandHistoryEntry(query=query, response=options)
-        self._write_to_history_file(entry)
+    def compact(self) -> None:
+        """Rewrite the log without superseded or unreadable lines, trimmed to `max_entries`."""
+        with file_lock(self.path):
+            index = self._load_index()
+            with open(self.path, "r", encoding=self.encoding, errors=self.encoding_errors) as f:
+                lines = [line if line.endswith("\n") else line + "\n" for line in f if line.strip()]
 
-    def get_history(self) -> list[CommandHistoryEntry]:
-        with open(self.path, "r", encoding=self.encoding) as f:
-            entries = [CommandHistoryEntry.model_validate_json(line) for line in f if line.strip()]
+            malformed = {line for line in lines if self._line_key(line) is None}
+            if malformed:
+                with open(self.quarantine_path, "a", encoding=self.encoding, errors=self.encoding_errors) as f:
+                    f.writelines(malformed)
+            self._rewrite([line for line in lines if line not in malformed], index)
+            self._write_index(index)
 
-        if not entries:
+    def _rewrite(self, lines: list[str], index: CommandHistoryIndex) -> dict[Optional[str], int]:
+        """
+        Compact and replace the log, then forget counters for entries that were trimmed from it and update where
+        the rest start. Returns the new offsets by key. Must be called holding the history lock.
+        """
+        lines = self._compact(lines)
+        atomic_write_lines(self.path, lines, encoding=self.encoding, errors=self.encoding_errors)
+
+        offsets = {}
+        position = 0
+        for line in lines:
+            offsets[self._line_key(line)] = position
+            position += len(line.encode(self.encoding, self.encoding_errors))
+        index.entries = {key: stats for key, stats in index.entries.items() if key in offsets}
+        for key, stats in index.entries.items():
+            stats.offset = offsets[key]
+        return offsets
+
+    def _compact(self, lines: list[str]) -> list[str]:
+        """Keep only the newest line for each query, then the newest `max_entries` of those."""
+        seen = set()
+        kept = []
+        for line in reversed(lines):
+            key = self._line_key(line)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        return list(reversed(kept[: self.max_entries]))
+
+    def _line_key(self, line: str) -> Optional[str]:
+        try:
+            return CommandHistoryHeader.from_json(line.encode(self.encoding, self.encoding_errors)).key
+        except ValidationError:
             return None
 
-        return entries
+    def _read_index(self) -> Optional[CommandHistoryIndex]:
+        try:
+            with open(self.index_path, "rb") as f:
+                return CommandHistoryIndex.from_json(f.read())
+        except (FileNotFoundError, ValidationError):
+            return None
 
-    def _write_to_history_file(self, new_entry: CommandHistoryEntry) -> None:
-        with open(self.path, "a", encoding=self.encoding) as f:
-            f.write(new_entry.model_dump_json() + "\n")
+    def _load_index(self) -> CommandHistoryIndex:
+        """Read the index, rebuilding it from the log if it's missing. Must be called holding the history lock."""
+        index = self._read_index()
+        if index is not None:
+            return index
 
-        # If we've exceeded max entries, trim the file
-        with open(self.path, "r", encoding=self.encoding) as f:
+        # History written before the index existed has no timestamps, so spread it out before the log's mtime
+        index = CommandHistoryIndex()
+        with open(self.path, "rb") as f:
             lines = f.readlines()
-            if len(lines) > self.max_entries:
-                with open(self.path, "w", encoding=self.encoding) as f:
-                    f.writelines(lines[-self.max_entries :])
+        mtime = os.path.getmtime(self.path)
+        offset = 0
+        for position, line in enumerate(lines):
+            line_offset, offset = offset, offset + len(line)
+            try:
+                header = CommandHistoryHeader.from_json(line)
+            except ValidationError:
+                continue
+            stats = index.entries.setdefault(header.key, CommandHistoryStats(header.key, header.title))
+            stats.offset = line_offset
+            stats.record_use(mtime - (len(lines) - position))
+        self._write_index(index)
+        return index
 
-    def display_history_options(self, reverse_history_entries, show_limit=5) -> Optional[CommandHistoryEntry]:
-        if not reverse_history_entries:
-            print("No command history found")
-            return None
+    def _write_index(self, index: CommandHistoryIndex) -> None:
+        atomic_write_lines(self.index_path, [index.to_json()], encoding=self.encoding)
 
+    def _quarantine_lines(self, malformed: list[str]) -> None:
+        """Move lines that can't be parsed out of the history file so they don't break future reads."""
+        malformed_set = {line.rstrip("\n") for line in malformed}
+        with file_lock(self.path):
+            with open(self.path, "r", encoding=self.encoding, errors=self.encoding_errors) as f:
+                lines = f.readlines()
+            atomic_write_lines(
+                self.path,
+                [line for line in lines if line.rstrip("\n") not in malformed_set],
+                encoding=self.encoding,
+                errors=self.encoding_errors,
+            )
+            with open(self.quarantine_path, "a", encoding=self.encoding, errors=self.encoding_errors) as f:
+                f.writelines(line if line.endswith("\n") else line + "\n" for line in malformed)
+
+    def display_history_options(
+        self, history_entries: Iterator[CommandHistoryStats], show_limit=5, page_size=20
+    ) -> Optional[CommandHistoryStats]:
         style = questionary.Style(
             [
                 ("answer", "fg:#61afef"),
@@ -57,38 +463,57 @@ class CommandHistory:
             ]
         )
 
-        query_options = [questionary.Choice(entry.query, value=entry) for entry in reverse_history_entries[:show_limit]]
-
-        if len(reverse_history_entries) > show_limit:
-            query_options.append(questionary.Choice("Show more...", value="show_more"))
+        loaded: list[CommandHistoryStats] = []
+        limit = show_limit
+        while True:
+            # Read one entry past the limit so we know whether to offer "Show more..."
+            loaded.extend(islice(history_entries, limit + 1 - len(loaded)))
+            if not loaded:
+                print("No command history found")
+                return None
 
-        query_options.append(questionary.Separator())
-        query_options.append(questionary.Choice("Cancel"))
+            query_options = [
+                # Follow-ups about failed runs include the command's output, so keep titles to one line
+                questionary.Choice(" ".join(entry.title.split()), value=entry, description=describe_stats(entry))
+                for entry in loaded[:limit]
+            ]
 
-        selected = questionary.select(
-            "Select from history:", choices=query_options, use_shortcuts=True, style=style
-        ).ask()
+            if len(loaded) > limit:
+                query_options.append(questionary.Choice("Show more...", value="show_more"))
 
-        if selected == "show_more":
-            all_options = [questionary.Choice(entry.query, value=entry) for entry in reverse_history_entries]
-            all_options.append(questionary.Separator())
-            all_options.append(questionary.Choice("Cancel"))
+            query_options.append(questionary.Separator())
+            query_options.append(questionary.Choice("Cancel"))
 
-            return questionary.select(
-                "Select from history (showing all items):", choices=all_options, use_shortcuts=True, style=style
+            selected = questionary.select(
+                "Select from history:",
+                choices=query_options,
+                # questionary only supports shortcuts for up to 36 choices
+                use_shortcuts=len(query_options) <= 36,
+                style=style,
             ).ask()
 
-        return selected
+            if selected != "show_more":
+                return selected
+
+            limit += page_size
 
     def show_history(self):
-        history_entries = self.get_history()
-        if not history_entries:
-            print("No command history found")
+        selected_stats = self.display_history_options(iter(self.get_ranked_stats()))
+
+        if selected_stats in (None, "Cancel"):
             return
 
-        selected_entry = self.display_history_options(list(reversed(history_entries)))
+        selected_header = self.find_entry(selected_stats.key, offset=selected_stats.offset)
+        if selected_header is None:
+            self._forget(selected_stats.key)
+            print("This history entry is no longer available")
+            return
 
-        if selected_entry in (None, "Cancel"):
+        try:
+            selected_entry = selected_header.load()
+        except ValidationError:
+            self._quarantine_lines([selected_header._raw.decode(self.encoding, self.encoding_errors)])
+            print("This history entry is corrupted and has been removed")
             return
 
         commands = selected_entry.response.commands
@@ -97,4 +522,33 @@ class CommandHistory:
             print("No commands available")
             return None
 
-        show_options(commands)
+        self._record_use(selected_stats.key)
+        show_options(
+            [annotate_last_run(cmd, selected_stats.runs.get(cmd.command)) for cmd in commands],
+            on_select=lambda cmd: self.record_selection(
+                selected_entry.query, cmd, refinements=selected_entry.refinements
+            ),
+            on_run=lambda cmd, run: self.record_run(
+                selected_entry.query, cmd, run, refinements=selected_entry.refinements
+            ),
+        )
+
+
+def describe_run(run: _RunFields) -> str:
+    return "last run " + CommandRun(run["exit_code"], run["duration"], run["output"], run["truncated"]).describe()
+
+
+def describe_stats(stats: CommandHistoryStats) -> Optional[str]:
+    parts = []
+    if stats.uses > 1:
+        parts.append(f"asked {stats.uses} times")
+    last_run = stats.last_run()
+    if last_run:
+        parts.append(describe_run(last_run))
+    return ", ".join(parts) or None
+
+
+def annotate_last_run(command: Command, run: Optional[_RunFields]) -> Command:
+    if run is None:
+        return command
+    return command.model_copy(update={"short_explanation": f"{command.short_explanation} ({describe_run(run)})"})
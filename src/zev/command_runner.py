@@ -0,0 +1,190 @@
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import BinaryIO
+
+if os.name != "nt":
+    import fcntl
+    import pty
+    import signal
+    import termios
+    import tty
+
+# Only the end of a command's output is kept, however much it prints
+OUTPUT_TAIL_BYTES = 16 * 1024
+READ_CHUNK_BYTES = 4096
+
+
+@dataclass
+class CommandRun:
+    exit_code: int
+    duration: float  # wall time in seconds
+    output: str  # the end of stdout and stderr, interleaved as they arrived
+    truncated: bool  # whether earlier output was dropped
+    captured: bool = True  # False if the command wrote straight to the console, so `output` is empty
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+    def describe(self) -> str:
+        if self.ok:
+            return f"succeeded in {self.duration:.1f}s"
+        return f"failed with exit code {self.exit_code} after {self.duration:.1f}s"
+
+
+class OutputTail:
+    """Ring buffer of the last `limit` bytes written to it."""
+
+    def __init__(self, limit: int = OUTPUT_TAIL_BYTES) -> None:
+        self.limit = limit
+        self.truncated = False
+        self._chunks: deque[bytes] = deque()
+        self._size = 0
+        self._lock = threading.Lock()  # stdout and stderr are read on separate threads
+
+    def append(self, chunk: bytes) -> None:
+        with self._lock:
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            while self._size - len(self._chunks[0]) >= self.limit:
+                self._size -= len(self._chunks.popleft())
+                self.truncated = True
+
+    def text(self) -> str:
+        with self._lock:
+            data = b"".join(self._chunks)
+        if len(data) > self.limit:
+            data = data[-self.limit :]
+            self.truncated = True
+        return data.decode("utf-8", errors="replace")
+
+
+def run_command(command: str) -> CommandRun:
+    """
+    Run a command in the user's shell, passing its output through as it arrives and keeping the end of it.
+    Ctrl-C reaches the command as it would in a terminal, and its exit code is recorded like any other.
+
+    In a terminal the command gets one too: on POSIX it runs in a pseudo-terminal that zev relays, so colours,
+    pagers and full-screen programs behave as usual. Windows has no pseudo-terminal to relay, so there it writes
+    straight to the console and its output isn't kept. Without a terminal, output is read through pipes.
+    """
+    if sys.stdin.isatty() and sys.stdout.isatty():
+        if os.name == "nt":
+            return _run_in_console(command)
+        return _run_in_pty(command)
+    return _run_with_pipes(command)
+
+
+def _run_with_pipes(command: str) -> CommandRun:
+    tail = OutputTail()
+    start = time.monotonic()
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, sys.stdout, tail), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, sys.stderr, tail), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        exit_code = process.wait()
+    except KeyboardInterrupt:
+        # The command got the same Ctrl-C, since it's in our process group; let it finish exiting
+        exit_code = process.wait()
+    for reader in readers:
+        reader.join()
+    return CommandRun(exit_code, time.monotonic() - start, tail.text(), tail.truncated)
+
+
+def _run_in_console(command: str) -> CommandRun:
+    start = time.monotonic()
+    process = subprocess.Popen(command, shell=True)
+    try:
+        exit_code = process.wait()
+    except KeyboardInterrupt:
+        exit_code = process.wait()
+    return CommandRun(exit_code, time.monotonic() - start, "", False, captured=False)
+
+
+def _run_in_pty(command: str) -> CommandRun:
+    tail = OutputTail()
+    stdin_fd, stdout_fd = sys.stdin.fileno(), sys.stdout.fileno()
+    sys.stdout.flush()
+    window_size = fcntl.ioctl(stdout_fd, termios.TIOCGWINSZ, b"\0" * 8)
+    start = time.monotonic()
+
+    pid, master_fd = pty.fork()
+    if pid == 0:
+        # The child: the pseudo-terminal is now its stdin, stdout, stderr and controlling terminal
+        try:
+            fcntl.ioctl(pty.STDOUT_FILENO, termios.TIOCSWINSZ, window_size)
+            os.execv("/bin/sh", ["/bin/sh", "-c", command])
+        finally:
+            os._exit(127)
+
+    def _resize(signum, frame):
+        fcntl.ioctl(master_fd, termios.TIOCSWINSZ, fcntl.ioctl(stdout_fd, termios.TIOCGWINSZ, b"\0" * 8))
+
+    try:
+        previous_handler = signal.signal(signal.SIGWINCH, _resize)
+    except ValueError:
+        previous_handler = None  # not on the main thread, so the size is only set once
+    # Raw mode passes every key, Ctrl-C included, on to the command's terminal, which handles them itself
+    terminal_mode = termios.tcgetattr(stdin_fd)
+    tty.setraw(stdin_fd)
+    try:
+        _relay(master_fd, stdin_fd, stdout_fd, tail)
+    finally:
+        termios.tcsetattr(stdin_fd, termios.TCSAFLUSH, terminal_mode)
+        if previous_handler is not None:
+            signal.signal(signal.SIGWINCH, previous_handler)
+        os.close(master_fd)
+    _, status = os.waitpid(pid, 0)
+    exit_code = os.waitstatus_to_exitcode(status)
+    # The pseudo-terminal turns \n into \r\n on the way out
+    return CommandRun(exit_code, time.monotonic() - start, tail.text().replace("\r\n", "\n"), tail.truncated)
+
+
+def _relay(master_fd: int, stdin_fd: int, stdout_fd: int, tail: OutputTail) -> None:
+    """Copy keystrokes to the command and its output back to the terminal until the command's side closes."""
+    watched = [master_fd, stdin_fd]
+    while True:
+        try:
+            readable, _, _ = select.select(watched, [], [])
+        except InterruptedError:
+            continue  # SIGWINCH
+        if master_fd in readable:
+            try:
+                chunk = os.read(master_fd, READ_CHUNK_BYTES)
+            except OSError:
+                chunk = b""  # Linux raises EIO once the command and everything it started have exited
+            if not chunk:
+                return
+            _write_all(stdout_fd, chunk)
+            tail.append(chunk)
+        if stdin_fd in readable:
+            keys = os.read(stdin_fd, READ_CHUNK_BYTES)
+            if keys:
+                _write_all(master_fd, keys)
+            else:
+                watched.remove(stdin_fd)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    while data:
+        data = data[os.write(fd, data) :]
+
+
+def _pump(source: BinaryIO, destination, tail: OutputTail) -> None:
+    # Read whatever is available rather than whole lines, so progress bars and prompts show up immediately
+    fd = source.fileno()
+    while chunk := os.read(fd, READ_CHUNK_BYTES):
+        destination.buffer.write(chunk)
+        destination.flush()
+        tail.append(chunk)
+    source.close()
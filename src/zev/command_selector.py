@@ -1,20 +1,68 @@
-from subprocess import run as run_command
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional
 
 import pyperclip
 import questionary
 from rich import print as rprint
+from rich.markup import escape
 
+from zev.command_runner import CommandRun, run_command
+from zev.constants import FAILED_RUN_CONTEXT_CHARS, FAILED_RUN_FOLLOW_UP
 from zev.llms.types import Command
+from zev.utils import get_input_string
 
+REFINE_OPTION = "refine"
+MORE_OPTIONS = "more_options"
+# Offline recipes use placeholders like <file> for the parts that vary. The shell would read them as redirections.
+PLACEHOLDER_PATTERN = re.compile(r"<[A-Za-z][\w-]*>")
 
-def show_options(commands: list[Command]):
-    options = assemble_options(commands)
+
+@dataclass
+class FollowUp:
+    """What the user asked for instead of picking a command"""
+
+    more_options: bool = False
+    refinement: Optional[str] = None
+
+
+def show_options(
+    commands: list[Command],
+    allow_refine: bool = False,
+    allow_more: bool = False,
+    on_select: Optional[Callable[[Command], None]] = None,
+    on_run: Optional[Callable[[Command, CommandRun], None]] = None,
+) -> Optional[FollowUp]:
+    """
+    Show the commands to pick from. Returns a FollowUp if the user asked for different options instead, or for a
+    fix after the command they ran failed. `on_select` is called with the command the user picked, and `on_run`
+    with it and the result if they ran it.
+    """
+    options = assemble_options(commands, allow_refine=allow_refine, allow_more=allow_more)
     selected = display_options(options)
-    handle_selected_option(selected)
+    if selected == MORE_OPTIONS:
+        return FollowUp(more_options=True)
+    if selected == REFINE_OPTION:
+        return FollowUp(refinement=get_input_string("follow-up", "How should the options change?", required=True))
+    run = handle_selected_option(selected, on_select=on_select, on_run=on_run)
+    # A negative exit code means the command was killed (e.g. by Ctrl-C) rather than failing on its own
+    if run and run.exit_code > 0 and allow_refine:
+        if questionary.confirm("Ask for a corrected command?", default=True).ask():
+            output = run.output[-FAILED_RUN_CONTEXT_CHARS:].strip()
+            if not output:
+                output = "(no output)" if run.captured else "(output not captured)"
+            return FollowUp(
+                refinement=FAILED_RUN_FOLLOW_UP.format(command=selected.command, exit_code=run.exit_code, output=output)
+            )
+    return None
 
 
-def assemble_options(commands: list[Command]):
+def assemble_options(commands: list[Command], allow_refine: bool = False, allow_more: bool = False):
     options = [questionary.Choice(cmd.command, description=cmd.short_explanation, value=cmd) for cmd in commands]
+    if allow_more:
+        options.append(questionary.Choice("More options...", value=MORE_OPTIONS))
+    if allow_refine:
+        options.append(questionary.Choice("Refine...", value=REFINE_OPTION))
     options.append(questionary.Choice("Cancel"))
     options.append(questionary.Separator())
     return options
@@ -36,20 +84,42 @@ def display_options(options: list[questionary.Choice]):
     return selected
 
 
-def handle_selected_option(selected):
-    if selected and selected != "Cancel":
-        print("")
-        if selected.dangerous_explanation:
-            rprint(f"[red]⚠️ Warning: {selected.dangerous_explanation}[/red]\n")
-        try:
-            pyperclip.copy(selected.command)
-            rprint("[green]✓[/green] Copied to clipboard")
-        except pyperclip.PyperclipException as e:
-            rprint(
-                "[red]Could not copy to clipboard (see https://github.com/dtnewman/zev?tab=readme-ov-file#-dependencies)[/red]\n"
-            )
-            rprint("[cyan]Here is your command:[/cyan]")
-            print(selected.command)
-            if questionary.confirm("Would you like to run it?").ask():
-                print("Running command:", selected.command)
-                run_command(selected.command, shell=True)
+def handle_selected_option(
+    selected,
+    on_select: Optional[Callable[[Command], None]] = None,
+    on_run: Optional[Callable[[Command, CommandRun], None]] = None,
+) -> Optional[CommandRun]:
+    """Copy the picked command and offer to run it. Returns how the run went, if the user ran it."""
+    if not selected or selected == "Cancel":
+        return None
+
+    if on_select:
+        on_select(selected)
+    print("")
+    if selected.dangerous_explanation:
+        rprint(f"[red]⚠️ Warning: {selected.dangerous_explanation}[/red]\n")
+    try:
+        pyperclip.copy(selected.command)
+        rprint("[green]✓[/green] Copied to clipboard")
+        copied = True
+    except pyperclip.PyperclipException:
+        rprint(
+            "[red]Could not copy to clipboard (see https://github.com/dtnewman/zev?tab=readme-ov-file#-dependencies)[/red]\n"
+        )
+        rprint("[cyan]Here is your command:[/cyan]")
+        print(selected.command)
+        copied = False
+
+    placeholders = list(dict.fromkeys(PLACEHOLDER_PATTERN.findall(selected.command)))
+    if placeholders:
+        rprint(f"[yellow]Replace {escape(', '.join(placeholders))} before running it.[/yellow]")
+        return None
+    if not questionary.confirm("Would you like to run it?", default=not copied).ask():
+        return None
+    rprint(f"[grey39]$ {escape(selected.command)}[/grey39]")
+    run = run_command(selected.command)
+    color = "green" if run.ok else "red"
+    rprint(f"\n[{color}]Command {run.describe()}[/{color}]")
+    if on_run:
+        on_run(selected, run)
+    return run
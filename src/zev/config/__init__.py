@@ -1,63 +1,162 @@
-from dotenv import dotenv_values
+import os
 
+from zev.config.snapshot import DEFAULT_CONFIG_PROFILE, ConfigProfile, ConfigSettings, get_source_key, load_profiles
 from zev.paths import get_config_path
 
+# Selects a named profile from the config file, like --config-profile
+CONFIG_PROFILE_ENV_VAR = "ZEV_CONFIG_PROFILE"
+
 
 class Config:
     def __init__(self):
         self.config_path = get_config_path()
+        self.profile_name = (os.environ.get(CONFIG_PROFILE_ENV_VAR) or DEFAULT_CONFIG_PROFILE).lower()
+        self.profiles: dict[str, ConfigProfile] = {}
+        self._source_key = None
         self.reload()
 
     def reload(self):
-        self.vals = dotenv_values(self.config_path)
+        """Load the config file if it changed since it was last loaded."""
+        source_key = get_source_key(self.config_path)
+        if self.profiles and source_key == self._source_key:
+            return
+        self.profiles = load_profiles(self.config_path, source_key)
+        self._source_key = source_key
+        self._activate()
+
+    def use_profile(self, name: str):
+        name = name.lower()
+        if name not in self.profiles:
+            raise ValueError(f"No config profile named '{name}' in {self.config_path}")
+        self.profile_name = name
+        self._activate()
+
+    def _activate(self):
+        profile = self.profiles.get(self.profile_name) or self.profiles[DEFAULT_CONFIG_PROFILE]
+        self._vals = profile.values
+        self.settings = profile.settings
+
+    @property
+    def vals(self):
+        """The raw values of the active profile."""
+        return self._vals
+
+    @vals.setter
+    def vals(self, values):
+        self._vals = values
+        self.settings = ConfigSettings.from_values(values, warn=False)
+
+    def export_to_environ(self):
+        """Make the active profile's values visible to libraries that read settings from the environment."""
+        for key, value in self._vals.items():
+            if value is not None:
+                os.environ[key] = value
 
     @property
     def llm_provider(self):
-        return self.vals.get("LLM_PROVIDER")
+        return self.settings.llm_provider
+
+    @property
+    def profile(self):
+        return self.settings.profile
 
     # OpenAI
     @property
     def openai_api_key(self):
-        return self.vals.get("OPENAI_API_KEY")
+        return self.settings.openai_api_key
 
     @property
     def openai_model(self):
-        return self.vals.get("OPENAI_MODEL")
+        return self.settings.openai_model
 
     # Ollama
     @property
     def ollama_base_url(self):
-        return self.vals.get("OLLAMA_BASE_URL")
+        return self.settings.ollama_base_url
 
     @property
     def ollama_model(self):
-        return self.vals.get("OLLAMA_MODEL")
+        return self.settings.ollama_model
 
     # Gemini
     @property
     def gemini_model(self):
-        return self.vals.get("GEMINI_MODEL")
+        return self.settings.gemini_model
 
     @property
     def gemini_api_key(self):
-        return self.vals.get("GEMINI_API_KEY")
+        return self.settings.gemini_api_key
 
     # Azure OpenAI
     @property
     def azure_openai_account_name(self):
-        return self.vals.get("AZURE_OPENAI_ACCOUNT_NAME")
+        return self.settings.azure_openai_account_name
 
     @property
     def azure_openai_api_key(self):
-        return self.vals.get("AZURE_OPENAI_API_KEY")
+        return self.settings.azure_openai_api_key
 
     @property
     def azure_openai_deployment(self):
-        return self.vals.get("AZURE_OPENAI_DEPLOYMENT")
+        return self.settings.azure_openai_deployment
 
     @property
     def azure_openai_api_version(self):
-        return self.vals.get("AZURE_OPENAI_API_VERSION")
+        return self.settings.azure_openai_api_version
+
+    @property
+    def azure_credential_sources(self):
+        return self.settings.azure_credential_sources
+
+    # Response cache
+    @property
+    def cache_backend(self):
+        return self.settings.cache_backend
+
+    @property
+    def cache_url(self):
+        return self.settings.cache_url
+
+    @property
+    def cache_auth_token(self):
+        return self.settings.cache_auth_token
+
+    @property
+    def cache_ttl_seconds(self):
+        return self.settings.cache_ttl_seconds
+
+    @property
+    def cache_negative_ttl_seconds(self):
+        return self.settings.cache_negative_ttl_seconds
+
+    @property
+    def cache_timeout_ms(self):
+        return self.settings.cache_timeout_ms
+
+    @property
+    def cache_redact_hook(self):
+        return self.settings.cache_redact_hook
+
+    # Rate limits, applied to each provider separately
+    @property
+    def rate_limit_rpm(self):
+        return self.settings.rate_limit_rpm
+
+    @property
+    def rate_limit_tpm(self):
+        return self.settings.rate_limit_tpm
+
+    @property
+    def daily_token_budget(self):
+        return self.settings.daily_token_budget
+
+    @property
+    def rate_limit_max_wait_seconds(self):
+        return self.settings.rate_limit_max_wait_seconds
+
+    @property
+    def maintenance_intervals(self):
+        return self.settings.maintenance_intervals
 
 
 config = Config()
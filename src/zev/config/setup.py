@@ -10,55 +10,58 @@ from zev.config.types import (
     SetupQuestionText,
 )
 from zev.constants import LLMProviders
+from zev.llms.plugins import get_plugins
 from zev.paths import get_config_path
-from zev.llms.azure_openai.setup import questions as azure_questions
-from zev.llms.gemini.setup import questions as gemini_questions
-from zev.llms.ollama.setup import questions as ollama_questions
-from zev.llms.openai.setup import questions as openai_questions
 
-setup_questions = [
-    SetupQuestionSelect(
-        name="LLM_PROVIDER",
-        prompt="Pick your LLM provider:",
-        options=[
-            SetupQuestionSelectOption(
-                value=LLMProviders.OPENAI,
-                label="OpenAI",
-                follow_up_questions=openai_questions,
-            ),
-            SetupQuestionSelectOption(
-                value=LLMProviders.OLLAMA,
-                label="Ollama",
-                follow_up_questions=ollama_questions,
-            ),
-            SetupQuestionSelectOption(
-                value=LLMProviders.GEMINI,
-                label="Gemini",
-                follow_up_questions=gemini_questions,
-            ),
-            SetupQuestionSelectOption(
-                value=LLMProviders.AZURE_OPENAI,
-                label="Azure OpenAI",
-                follow_up_questions=azure_questions,
-            ),
-        ],
+
+def get_setup_questions() -> list[SetupQuestion]:
+    provider_options = [
+        SetupQuestionSelectOption(
+            value=plugin.name,
+            label=plugin.label,
+            description=plugin.description,
+            # Only the chosen provider's setup module gets imported
+            load_follow_up_questions=plugin.load_setup_questions,
+        )
+        for plugin in get_plugins().values()
+    ]
+    provider_options.append(
+        SetupQuestionSelectOption(
+            value=LLMProviders.AUTO,
+            label="Auto",
+            description="Use whichever provider you've already set up has been fastest recently",
+        )
     )
-]
+    return [SetupQuestionSelect(name="LLM_PROVIDER", prompt="Pick your LLM provider:", options=provider_options)]
 
 
 def prompt_question(question: SetupQuestion, answers: Dict[str, str]) -> Dict[str, str]:
     existing_answer = answers.get(question.name)
     if isinstance(question, SetupQuestionSelect):
+        notes = {}
+        run_probe = (
+            question.probe
+            and questionary.confirm("Benchmark these options first? (sends a few short queries)", default=True).ask()
+        )
+        if run_probe:
+            notes = question.probe.run(answers, [option.value for option in question.options])
+
         selected_option: SetupQuestionSelectOption = questionary.select(
             question.prompt,
             choices=[
-                questionary.Choice(option.label, description=option.description, value=option)
+                questionary.Choice(
+                    option.label,
+                    description=" | ".join(d for d in (option.description, notes.get(option.value)) if d) or None,
+                    value=option,
+                )
                 for option in question.options
             ],
         ).ask()
 
         answers[question.name] = selected_option.value
-        for q in selected_option.follow_up_questions:
+        if notes:
+            question.probe.save(selected_option.value)
+        for q in selected_option.get_follow_up_questions():
             answers.update(prompt_question(q, answers=answers))
     elif isinstance(question, SetupQuestionText):
         answer = questionary.text(
@@ -75,7 +78,7 @@ def prompt_question(question: SetupQuestion, answers: Dict[str, str]) -> Dict[st
 def run_setup():
     config_path = get_config_path()
     answers = dotenv_values(config_path)  # load in current values and then override as necessary
-    for question in setup_questions:
+    for question in get_setup_questions():
         answers.update(prompt_question(question, answers))
 
     new_file = ""
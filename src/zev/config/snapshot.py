@@ -0,0 +1,145 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from dotenv import dotenv_values
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from zev.file_utils import atomic_write_lines
+from zev.paths import get_config_snapshot_path
+
+# Bump when ConfigSettings or the snapshot layout changes so old snapshots are recompiled
+SNAPSHOT_VERSION = 2
+DEFAULT_CONFIG_PROFILE = "default"
+# `WORK__OPENAI_MODEL=...` sets OPENAI_MODEL in the "work" profile
+PROFILE_SEPARATOR = "__"
+
+
+class ConfigSettings(BaseModel):
+    """Typed values from the config file. Field names are the lowercased setting names."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    llm_provider: Optional[str] = None
+    profile: Optional[str] = None
+
+    openai_api_key: Optional[str] = None
+    openai_model: Optional[str] = None
+
+    ollama_base_url: Optional[str] = None
+    ollama_model: Optional[str] = None
+
+    gemini_model: Optional[str] = None
+    gemini_api_key: Optional[str] = None
+
+    azure_openai_account_name: Optional[str] = None
+    azure_openai_api_key: Optional[str] = None
+    azure_openai_deployment: Optional[str] = None
+    azure_openai_api_version: Optional[str] = None
+    azure_credential_sources: Optional[str] = None
+
+    cache_backend: Optional[str] = None
+    cache_url: Optional[str] = None
+    cache_auth_token: Optional[str] = None
+    cache_ttl_seconds: Optional[int] = None
+    cache_negative_ttl_seconds: Optional[int] = None
+    cache_timeout_ms: Optional[int] = None
+    cache_redact_hook: Optional[str] = None
+
+    rate_limit_rpm: Optional[int] = None
+    rate_limit_tpm: Optional[int] = None
+    daily_token_budget: Optional[int] = None
+    rate_limit_max_wait_seconds: Optional[int] = None
+
+    maintenance_intervals: Optional[str] = None
+
+    @classmethod
+    def from_values(cls, values: dict[str, Optional[str]], warn: bool = True) -> "ConfigSettings":
+        """Validate raw config values, skipping (and by default warning about) any that don't parse."""
+        fields = {key.lower(): value for key, value in values.items() if value}
+        try:
+            return cls.model_validate(fields)
+        except ValidationError as e:
+            invalid = {error["loc"][0] for error in e.errors()}
+            if warn:
+                for name in sorted(invalid):
+                    print(f"Ignoring invalid value {fields[name]!r} for {name.upper()} in your zev config")
+            return cls.model_validate({key: value for key, value in fields.items() if key not in invalid})
+
+
+class ConfigProfile:
+    """The raw values and typed settings of one named profile."""
+
+    __slots__ = ("values", "settings")
+
+    def __init__(self, values: dict[str, Optional[str]], settings: ConfigSettings) -> None:
+        self.values = values
+        self.settings = settings
+
+
+def split_profiles(values: dict[str, Optional[str]]) -> dict[str, dict[str, Optional[str]]]:
+    """Each named profile is the top-level settings with its own prefixed settings layered on top."""
+    base = {}
+    overrides: dict[str, dict[str, Optional[str]]] = {}
+    for key, value in values.items():
+        name, separator, setting = key.partition(PROFILE_SEPARATOR)
+        if separator and name and setting:
+            overrides.setdefault(name.lower(), {})[setting] = value
+        else:
+            base[key] = value
+
+    profiles = {DEFAULT_CONFIG_PROFILE: base}
+    for name, profile_values in overrides.items():
+        profiles[name] = {**base, **profile_values}
+    return profiles
+
+
+def get_source_key(config_path: Path) -> Optional[list]:
+    """Identifies the config file's current contents without reading it."""
+    try:
+        stat = os.stat(config_path)
+    except FileNotFoundError:
+        return None
+    return [str(config_path), stat.st_mtime_ns, stat.st_size]
+
+
+def load_profiles(config_path: Path, source_key: Optional[list]) -> dict[str, ConfigProfile]:
+    """
+    Load every profile in the config file. The parsed and validated result is kept in a snapshot in the app dir
+    and reused until the config file's mtime or size changes.
+    """
+    if source_key is None:
+        return {DEFAULT_CONFIG_PROFILE: ConfigProfile({}, ConfigSettings())}
+
+    snapshot_path = get_config_snapshot_path()
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot["version"] == SNAPSHOT_VERSION and snapshot["source"] == source_key:
+            # Validated when the snapshot was written, so skip validating again
+            return {
+                name: ConfigProfile(profile["values"], ConfigSettings.model_construct(**profile["settings"]))
+                for name, profile in snapshot["profiles"].items()
+            }
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    profiles = {
+        name: ConfigProfile(values, ConfigSettings.from_values(values))
+        for name, values in split_profiles(dotenv_values(config_path)).items()
+    }
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "source": source_key,
+        "profiles": {
+            name: {"values": profile.values, "settings": profile.settings.model_dump(exclude_unset=True)}
+            for name, profile in profiles.items()
+        },
+    }
+    try:
+        # The snapshot holds the same secrets as the config file; atomic_write_lines creates it private to the user
+        atomic_write_lines(snapshot_path, [json.dumps(snapshot)])
+    except OSError:
+        pass  # the snapshot only saves time, so a read-only app dir just means parsing every run
+    return profiles
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -10,6 +10,12 @@ class SetupQuestionSelectOption:
     label: str
     description: Optional[str] = None
     follow_up_questions: Tuple["SetupQuestion", ...] = ()
+    load_follow_up_questions: Optional[Callable[[], Tuple["SetupQuestion", ...]]] = None  # only called if chosen
+
+    def get_follow_up_questions(self) -> Tuple["SetupQuestion", ...]:
+        if self.load_follow_up_questions:
+            return self.follow_up_questions + self.load_follow_up_questions()
+        return self.follow_up_questions
 
 
 @dataclass
@@ -18,11 +24,23 @@ class SetupQuestion:
     prompt: str
 
 
+class SetupProbe:
+    """Measures the options of a select question (with the answers given so far) before they're shown"""
+
+    def run(self, answers: Dict[str, str], values: List[str]) -> Dict[str, str]:
+        """Returns a note to show next to each option, keyed by option value"""
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def save(self, chosen: str) -> None:
+        pass
+
+
 @dataclass
 class SetupQuestionSelect(SetupQuestion):
     """Prompts the user with a select menu"""
 
     options: List[SetupQuestionSelectOption]
+    probe: Optional[SetupProbe] = None  # offered before the menu is shown, e.g. to benchmark models
 
 
 @dataclass
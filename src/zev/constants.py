@@ -3,16 +3,53 @@ class LLMProviders:
     OLLAMA = "ollama"
     GEMINI = "gemini"
     AZURE_OPENAI = "azure_openai"
+    AUTO = "auto"  # pick the fastest of the configured providers
 
 
 DEFAULT_PROVIDER = LLMProviders.OPENAI
 
+# Entry point group that third-party provider plugins register under
+PROVIDER_PLUGIN_GROUP = "zev.providers"
+
+
+class ProviderCapabilities:
+    STREAMING = "streaming"  # can show output as it's generated
+    ASYNC = "async"  # has a non-blocking client
+    BATCHING = "batching"  # returns several samples from one request
+
+
+class Profiles:
+    FAST = "fast"
+    BALANCED = "balanced"
+    THOROUGH = "thorough"
+
+
+# most queries are simple, so don't pay for thinking time by default
+DEFAULT_PROFILE = Profiles.FAST
+
 # Default model names for each provider
 OPENAI_DEFAULT_MODEL = "gpt-5.4-mini"
 GEMINI_DEFAULT_MODEL = "gemini-3-flash-preview"
 GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+GEMINI_REQUEST_TIMEOUT_SECONDS = 120  # thorough-profile answers can think for a while, but never hang forever
 
 OPENAI_BASE_URL = "https://api.openai.com/v1"
+# Per attempt, for OpenAI and the OpenAI-compatible providers; the SDK's own default is 10 minutes
+OPENAI_REQUEST_TIMEOUT_SECONDS = 120
+
+
+class CacheBackends:
+    NONE = "none"
+    FILE = "file"
+    REDIS = "redis"
+    HTTP = "http"
+
+
+CACHE_DEFAULT_TTL = 7 * 86400  # 7 days
+CACHE_DEFAULT_NEGATIVE_TTL = 3600  # invalid queries are only remembered for an hour
+CACHE_DEFAULT_TIMEOUT_MS = 150
+
+RATE_LIMIT_DEFAULT_MAX_WAIT_SECONDS = 30
 
 PROMPT = """
 You are a helpful assistant that helps users remember commands for the terminal. You 
@@ -52,3 +89,30 @@ Here is the users prompt:
 
 {prompt}
 """
+
+REFINE_PROMPT = """
+The user wants to adjust the options you just gave them. Return a new set of options in the
+same JSON format, following the same rules as before.
+
+Here is the user's follow-up:
+
+============== 
+
+{follow_up}
+"""
+
+FAILED_RUN_FOLLOW_UP = """I ran `{command}` and it failed with exit code {exit_code}. The end of its output was:
+
+{output}
+
+Suggest commands that fix this."""
+# How much of a failed command's output goes back to the model
+FAILED_RUN_CONTEXT_CHARS = 2000
+
+EXPLAIN_QUERY = """Explain what the command `{command}` does. These parts of it aren't in the local man pages: \
+{unresolved}. Return this exact command as the only option, with short_explanation saying what it does \
+(including those parts), and mark it as dangerous if it is."""
+
+REFINE_TRANSCRIPT_PROMPT = """{query}
+
+(You already suggested: {previous_commands}. The user followed up with: {follow_up})"""
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from rich import print as rprint
+from rich.markup import escape
+
+from zev.explain.help_index import get_program_help
+from zev.explain.parser import REDIRECTS, SEPARATORS, WRAPPERS, Stage, is_flag, split_flag, split_stages
+from zev.llms.types import Command
+
+# Programs whose first argument picks a subcommand with its own flags (and usually its own man page, e.g. git-reset)
+SUBCOMMAND_PROGRAMS = frozenset(
+    "apt apt-get brew cargo docker git go kubectl npm pip pip3 pnpm podman systemctl yarn".split()
+)
+SHELL_BUILTINS = {
+    "cd": "change the current directory",
+    "export": "set an environment variable for this shell and the commands it runs",
+    "source": "run a script in the current shell",
+    ".": "run a script in the current shell",
+    "alias": "define a shortcut for a command",
+    "unset": "remove a variable",
+}
+
+# (program, subcommand, flags, why): a command is dangerous if it uses any of the flags
+DANGEROUS_FLAGS = (
+    ("rm", None, ("-r", "-R", "--recursive", "-f", "--force"), "Deletes files without asking, and can't be undone"),
+    ("git", "reset", ("--hard",), "Discards uncommitted changes"),
+    ("git", "clean", ("-f", "--force"), "Deletes untracked files"),
+    ("git", "push", ("-f", "--force"), "Overwrites history on the remote"),
+    ("git", "checkout", (".", "--"), "Discards uncommitted changes to the files"),
+    ("chmod", None, ("-R", "--recursive"), "Changes permissions of everything under the path"),
+    ("chown", None, ("-R", "--recursive"), "Changes ownership of everything under the path"),
+    ("find", None, ("-delete",), "Deletes every file it matches"),
+    ("kill", None, ("-9", "-KILL", "-SIGKILL"), "Stops processes without letting them clean up"),
+)
+DANGEROUS_PROGRAMS = {
+    "dd": "Writes raw data and can overwrite a whole disk",
+    "shred": "Overwrites files so they can't be recovered",
+    "mkfs": "Formats a filesystem, erasing everything on it",
+    "shutdown": "Shuts down the machine",
+    "reboot": "Restarts the machine",
+}
+
+
+@dataclass
+class Part:
+    token: str
+    explanation: Optional[str]
+    kind: str  # program, subcommand, flag, argument or operator
+
+    @property
+    def resolved(self) -> bool:
+        return self.explanation is not None or self.kind == "argument"
+
+
+@dataclass
+class Explanation:
+    command: Command  # short_explanation is built from the index; the danger fields come from DANGEROUS_FLAGS
+    parts: list[Part]
+
+    @property
+    def unresolved(self) -> list[str]:
+        return [part.token for part in self.parts if not part.resolved]
+
+
+def explain(command: str) -> Explanation:
+    """Explain each program, flag and operator in a command line using only what's installed locally."""
+    parts: list[Part] = []
+    summaries: list[str] = []
+    dangers: list[str] = []
+    for stage in split_stages(command):
+        stage_parts = explain_stage(stage)
+        parts += stage_parts
+        program = next((part for part in stage_parts if part.kind == "program"), None)
+        if program and program.explanation:
+            summaries.append(f"{program.token}: {program.explanation}")
+        dangers += find_dangers(stage)
+
+    return Explanation(
+        command=Command(
+            command=command,
+            short_explanation="; ".join(summaries),
+            is_dangerous=bool(dangers),
+            dangerous_explanation="; ".join(dangers) or None,
+        ),
+        parts=parts,
+    )
+
+
+def explain_stage(stage: Stage) -> list[Part]:
+    parts = [Part(wrapper, WRAPPERS[wrapper], "operator") for wrapper in stage.wrappers]
+    parts += [
+        Part(assignment, f"set {assignment.split('=')[0]} for this command", "operator") for assignment in stage.env
+    ]
+
+    if stage.program:
+        subcommand = _get_subcommand(stage)
+        program_help = get_program_help(stage.program)
+        subcommand_help = get_program_help(stage.program, subcommand) if subcommand else None
+        summary = program_help.summary if program_help else SHELL_BUILTINS.get(stage.program)
+        parts.append(Part(stage.program, summary, "program"))
+
+        # A subcommand's own flags win over the program's
+        flags = {**(program_help.flags if program_help else {}), **(subcommand_help.flags if subcommand_help else {})}
+        for arg in stage.args:
+            if arg == subcommand:
+                parts.append(Part(arg, subcommand_help.summary if subcommand_help else None, "subcommand"))
+                subcommand = None
+            elif is_flag(arg):
+                parts += [Part(flag, flags.get(flag), "flag") for flag in split_flag(arg, set(flags))]
+            else:
+                parts.append(Part(arg, None, "argument"))
+
+    for operator, target in stage.redirects:
+        token = f"{operator}{target}" if operator.endswith("&") else f"{operator} {target}"
+        parts.append(Part(token, _describe_redirect(operator, target), "operator"))
+    if stage.separator:
+        parts.append(Part(stage.separator, SEPARATORS[stage.separator], "operator"))
+    return parts
+
+
+def find_dangers(stage: Stage) -> list[str]:
+    if not stage.program:
+        return []
+    program = stage.program.rsplit("/", 1)[-1]
+    # mkfs.ext4 and friends count as mkfs
+    why = DANGEROUS_PROGRAMS.get(program.split(".")[0])
+    if why:
+        return [why]
+
+    # Check combined short flags letter by letter, since the index may not know this program
+    used = set()
+    for arg in stage.args:
+        used.add(arg)
+        if is_flag(arg) and not arg.startswith("--"):
+            used.update(f"-{char}" for char in arg[1:])
+    subcommand = _get_subcommand(stage)
+    return [
+        why
+        for rule_program, rule_subcommand, flags, why in DANGEROUS_FLAGS
+        if rule_program == program and rule_subcommand in (None, subcommand) and used.intersection(flags)
+    ]
+
+
+def print_explanation(explanation: Explanation) -> None:
+    width = min(24, max((len(part.token) for part in explanation.parts), default=0) + 2)
+    rprint(f"[bold]{escape(explanation.command.command)}[/bold]\n")
+    for part in explanation.parts:
+        indent = "  " if part.kind in ("flag", "argument", "subcommand") else ""
+        token = escape(part.token.ljust(width - len(indent) - 1)) + " "
+        if part.kind == "argument":
+            rprint(f"  {indent}[grey39]{token}[/grey39]")
+        elif part.explanation is None:
+            rprint(f"  {indent}[cyan]{token}[/cyan][yellow]not in the local man pages[/yellow]")
+        else:
+            rprint(f"  {indent}[cyan]{token}[/cyan]{escape(part.explanation)}")
+
+
+def _get_subcommand(stage: Stage) -> Optional[str]:
+    if stage.program not in SUBCOMMAND_PROGRAMS:
+        return None
+    return next((arg for arg in stage.args if not is_flag(arg)), None)
+
+
+def _describe_redirect(operator: str, target: str) -> str:
+    fd = operator[: len(operator) - len(operator.lstrip("0123456789"))]
+    description = REDIRECTS[operator[len(fd) :]]
+    if operator.endswith("&") and target in ("1", "2"):
+        target = "the output" if target == "1" else "the errors"
+    if fd == "2":
+        description = description.replace("the output", "the errors")
+    return description.format(target=target)
@@ -0,0 +1,143 @@
+"""
+Flag descriptions for installed programs, read from their man pages. A program's index is built the first time one
+of its commands is explained, and kept in the app dir until its binary changes.
+
+Programs are never run to ask for their `--help`: explaining a command must not execute any part of it, and a
+program that ignores `--help` would just run. Programs without a man page are left for the model to explain.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from zev.file_utils import atomic_write_lines
+from zev.paths import get_help_index_dir
+
+# Bump when parsing changes so indexes built by older versions are rebuilt
+INDEX_VERSION = 2
+MAN_TIMEOUT_SECONDS = 3
+MAX_DESCRIPTION_CHARS = 160
+
+# An indented line starting with a flag, e.g. "  -a, --all    do not ignore entries starting with ."
+_FLAG_LINE = re.compile(r"^(\s{1,16})(-\S.*)$")
+_FLAG = re.compile(r"(?<![\w-])(--?[A-Za-z0-9?#@][\w?#@.+-]*)")
+# Overstrike bold/underline and ANSI escapes, in case the man pager leaves formatting in
+_FORMATTING = re.compile(r".\x08|\x1b\[[0-9;]*m")
+
+
+@dataclass
+class ProgramHelp:
+    page: str  # the program, or e.g. git-reset for a subcommand
+    summary: Optional[str]
+    flags: dict[str, str]
+
+
+def get_program_help(program: str, subcommand: Optional[str] = None) -> Optional[ProgramHelp]:
+    """
+    Flag descriptions for a program, or one of its subcommands (found through man pages such as git-reset). Returns
+    None for programs that aren't installed or have no man page.
+    """
+    path = shutil.which(program)
+    if path is None:
+        return None
+    page = f"{program}-{subcommand}" if subcommand else program
+    stat = os.stat(path)
+    source = [path, stat.st_mtime_ns, stat.st_size]
+
+    cache_path = get_help_index_dir() / (re.sub(r"[^\w.+-]", "_", page) + ".json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["version"] == INDEX_VERSION and cached["source"] == source:
+            return ProgramHelp(**cached["help"]) if cached["help"] else None
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    text = _read_man_page(page)
+    program_help = ProgramHelp(page, _parse_man_summary(text), parse_flags(text)) if text is not None else None
+
+    cached = {"version": INDEX_VERSION, "source": source, "help": asdict(program_help) if program_help else None}
+    try:
+        atomic_write_lines(cache_path, [json.dumps(cached)])
+    except OSError:
+        pass  # the index only saves time
+    return program_help
+
+
+def parse_flags(text: str) -> dict[str, str]:
+    """Map each flag in man page text to the first line or so of its description."""
+    lines = text.splitlines()
+    flags: dict[str, str] = {}
+    for i, line in enumerate(lines):
+        match = _FLAG_LINE.match(line)
+        if not match:
+            continue
+        indent = len(match.group(1).expandtabs())
+        # The flags and their arguments are separated from an inline description by at least two spaces
+        spec, *inline = re.split(r"\s{2,}|\t", match.group(2).strip(), maxsplit=1)
+        description = inline[0] if inline else ""
+        for following in lines[i + 1 :]:
+            following_indent = len(following.expandtabs()) - len(following.expandtabs().lstrip())
+            if (
+                not following.strip()
+                or following.lstrip().startswith("-")
+                or following_indent <= indent
+                or len(description) > MAX_DESCRIPTION_CHARS
+            ):
+                break
+            description = f"{description} {following.strip()}".strip()
+        if not description:
+            continue
+
+        description = _first_sentence(description)
+        for flag in _FLAG.findall(spec):
+            flags.setdefault(flag, description)
+    return flags
+
+
+def _first_sentence(text: str) -> str:
+    # Keep dots that aren't the end of a sentence, as in "do not ignore entries starting with ."
+    sentence = re.sub(r"(?<=[\w)])\.$", "", re.split(r"(?<=[a-z)])\.\s", text, maxsplit=1)[0])
+    if len(sentence) > MAX_DESCRIPTION_CHARS:
+        sentence = sentence[: MAX_DESCRIPTION_CHARS - 1].rsplit(" ", 1)[0] + "…"
+    return sentence
+
+
+def _parse_man_summary(text: str) -> Optional[str]:
+    """The description in the NAME section, e.g. "list directory contents" from "ls - list directory contents"."""
+    lines = iter(text.splitlines())
+    for line in lines:
+        if line.strip() == "NAME":
+            break
+    for line in lines:
+        if line.strip():
+            _, separator, summary = line.partition(" - ")
+            return summary.strip() if separator else None
+    return None
+
+
+def _read_man_page(page: str) -> Optional[str]:
+    if shutil.which("man") is None:
+        return None
+    env = {**os.environ, "MANPAGER": "cat", "PAGER": "cat", "MANWIDTH": "120", "GROFF_NO_SGR": "1"}
+    env.pop("MAN_KEEP_FORMATTING", None)
+    try:
+        result = subprocess.run(
+            # `--` so a page name can never be read as one of man's own options
+            ["man", "--", page],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            errors="replace",
+            env=env,
+            timeout=MAN_TIMEOUT_SECONDS,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    return _FORMATTING.sub("", result.stdout)
@@ -0,0 +1,103 @@
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Operators that end one command and start the next
+SEPARATORS = {
+    "|": "pass the output to the next command",
+    "|&": "pass the output and errors to the next command",
+    "&&": "then, if that succeeded,",
+    "||": "otherwise, if that failed,",
+    ";": "then",
+    "&": "run that in the background, then",
+}
+REDIRECTS = {
+    ">": "write the output to {target}, replacing it",
+    ">>": "append the output to {target}",
+    "<": "read the input from {target}",
+    "&>": "write the output and errors to {target}, replacing it",
+    ">&": "send the output to {target}",
+    "<<": "read the input from the following lines, up to {target}",
+    "<<<": "read the input from the string {target}",
+}
+# Commands that run the command after them
+WRAPPERS = {
+    "sudo": "run the rest as root",
+    "time": "time the rest",
+    "nohup": "keep the rest running after the terminal closes",
+    "exec": "replace the shell with the rest",
+    "command": "run the rest, skipping shell functions and aliases",
+}
+_ENV_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+@dataclass
+class Stage:
+    """One simple command in a command line, e.g. `grep -i foo` in `cat x | grep -i foo > out`."""
+
+    program: Optional[str] = None
+    args: list[str] = field(default_factory=list)
+    wrappers: list[str] = field(default_factory=list)  # e.g. sudo, in the order they appear
+    env: list[str] = field(default_factory=list)  # NAME=value assignments before the program
+    redirects: list[tuple[str, str]] = field(default_factory=list)  # (operator, target)
+    separator: Optional[str] = None  # the operator after this stage, if any
+
+
+def tokenize(command: str) -> list[str]:
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        return list(lexer)
+    except ValueError:
+        # Unbalanced quotes; explain what we can
+        return command.split()
+
+
+def split_stages(command: str) -> list[Stage]:
+    stages = [Stage()]
+    tokens = tokenize(command)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        stage = stages[-1]
+        # `2>` and `2>&1` come out as a file descriptor followed by the operator
+        if token.isdigit() and i + 1 < len(tokens) and tokens[i + 1] in REDIRECTS:
+            i += 1
+            token = f"{token}{tokens[i]}"
+        operator = token.lstrip("0123456789")
+        if token in SEPARATORS:
+            stage.separator = token
+            stages.append(Stage())
+        elif operator in REDIRECTS:
+            target = tokens[i + 1] if i + 1 < len(tokens) else ""
+            stage.redirects.append((token, target))
+            i += 1
+        elif stage.program is None and not stage.args and _ENV_ASSIGNMENT.match(token):
+            stage.env.append(token)
+        elif stage.program is None and token in WRAPPERS and i + 1 < len(tokens):
+            stage.wrappers.append(token)
+        elif stage.program is None:
+            stage.program = token
+        else:
+            stage.args.append(token)
+        i += 1
+    return [stage for stage in stages if stage.program or stage.redirects]
+
+
+def split_flag(arg: str, known_flags: set[str]) -> list[str]:
+    """
+    The flags in one argument: `--color=auto` is `--color`, and `-la` is `-l` and `-a` unless the program has a
+    flag actually called `-la` (like find's `-name`).
+    """
+    if arg.startswith("--"):
+        return [arg.split("=", 1)[0]]
+    if arg in known_flags or len(arg) <= 2:
+        return [arg]
+    if all(f"-{char}" in known_flags for char in arg[1:]):
+        return [f"-{char}" for char in arg[1:]]
+    return [arg]
+
+
+def is_flag(arg: str) -> bool:
+    return len(arg) > 1 and arg.startswith("-") and arg != "--"
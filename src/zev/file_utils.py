@@ -0,0 +1,69 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on `path` (via a sibling .lock file) for the duration of the block.
+
+    The lock is shared between processes, so it can be used to serialize access to files in the app dir
+    across concurrently running zev instances. Windows has no shared locks, so `shared` is ignored there.
+    """
+    lock_path = path.with_name(path.name + ".lock")
+    with open(lock_path, "a+b") as lock_file:
+        if os.name == "nt":
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_lines(path: Path, lines: Iterable[str], encoding: str = "utf-8", errors: str = "strict") -> None:
+    """Replace the contents of `path` by writing to a temp file in the same dir and renaming it over."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, errors=errors) as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def iter_lines_reversed(f: BinaryIO, end: int, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield the non-blank lines of `f` up to byte offset `end`, last line first, reading backwards in blocks."""
+    position = end
+    remainder = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        lines = (f.read(read_size) + remainder).split(b"\n")
+        # The first piece may be the tail of a line that starts in an earlier block
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            if line.strip():
+                yield line
+    if remainder.strip():
+        yield remainder
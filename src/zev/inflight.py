@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class InFlightCall:
+    """
+    Runs a blocking call on a daemon thread so the main thread can keep the status line moving and react to Ctrl-C
+    straight away. An abandoned call's result is discarded, and its thread never holds up exit (which is why this
+    isn't a ThreadPoolExecutor, whose threads are joined at exit).
+    """
+
+    def __init__(self, fn: Callable[[], Any]) -> None:
+        self._fn = fn
+        self._done = threading.Event()
+        self._result = None
+        self._error: Optional[BaseException] = None
+        self.start = time.monotonic()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Wait up to `timeout` seconds (or until it finishes, if None), returning whether the call finished. Ctrl-C
+        interrupts the wait.
+        """
+        return self._done.wait(timeout)
+
+    def result(self):
+        """The call's return value, or its exception raised again. Only valid once `wait` returned True."""
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _run(self) -> None:
+        try:
+            self._result = self._fn()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
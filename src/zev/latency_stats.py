@@ -0,0 +1,92 @@
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from zev.file_utils import atomic_write_lines, file_lock
+from zev.paths import get_latency_stats_path
+
+MAX_SAMPLES = 100  # per (provider, model); older samples roll off
+MIN_SAMPLES = 3  # backends with fewer samples get tried before we trust the numbers
+EXPLORATION_RATE = 0.1  # how often auto mode picks a random backend to keep the stats fresh
+
+
+@dataclass
+class LatencySummary:
+    samples: int
+    p50: float
+    p90: float
+    p95: float
+    error_rate: float
+
+    @property
+    def score(self) -> float:
+        """Lower is better. Errors make a backend look proportionally slower, since they cost a retry."""
+        return self.p90 / max(0.1, 1 - self.error_rate)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LatencyStats:
+    """Rolling latency and error samples per (provider, model), shared by every zev process via the app dir."""
+
+    def __init__(self) -> None:
+        self.path = get_latency_stats_path()
+
+    def record(self, provider: str, model: str, latency: float, ok: bool, profile: Optional[str] = None) -> None:
+        key = f"{provider}/{model}"
+        try:
+            with file_lock(self.path):
+                data = self._read()
+                samples = data.setdefault(key, [])
+                samples.append([round(time.time()), round(latency, 3), ok, profile])
+                data[key] = samples[-MAX_SAMPLES:]
+                atomic_write_lines(self.path, [json.dumps(data)])
+        except OSError:
+            pass  # stats are best-effort and must never break a query
+
+    def summary(self, provider: str, model: str, profile: Optional[str] = None) -> Optional[LatencySummary]:
+        """Summarize recent samples, optionally only those made with the given profile."""
+        with file_lock(self.path, shared=True):
+            samples = self._read().get(f"{provider}/{model}", [])
+        # samples are [timestamp, latency, ok, profile]
+        if profile:
+            samples = [sample for sample in samples if sample[3:] == [profile]]
+        if not samples:
+            return None
+
+        # Failed calls often return early, so only successful ones count towards latency
+        latencies = sorted(sample[1] for sample in samples if sample[2])
+        errors = sum(1 for sample in samples if not sample[2])
+        if not latencies:
+            return LatencySummary(len(samples), float("inf"), float("inf"), float("inf"), 1.0)
+        return LatencySummary(
+            samples=len(samples),
+            p50=_percentile(latencies, 0.5),
+            p90=_percentile(latencies, 0.9),
+            p95=_percentile(latencies, 0.95),
+            error_rate=errors / len(samples),
+        )
+
+    def pick_fastest(self, candidates: list[tuple[str, str]]) -> tuple[str, str]:
+        """
+        Pick the (provider, model) with the best recent p90. Backends without enough samples are tried
+        first, and once in a while a random one is picked so stale statistics get refreshed.
+        """
+        summaries = {candidate: self.summary(*candidate) for candidate in candidates}
+        unexplored = [c for c, s in summaries.items() if s is None or s.samples < MIN_SAMPLES]
+        if unexplored:
+            return unexplored[0]
+        if len(candidates) > 1 and random.random() < EXPLORATION_RATE:
+            return random.choice(candidates)
+        return min(candidates, key=lambda c: summaries[c].score)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
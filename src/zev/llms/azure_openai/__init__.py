@@ -0,0 +1,21 @@
+from typing import Optional
+
+from zev.config import config
+from zev.constants import LLMProviders, ProviderCapabilities
+from zev.llms.plugins import ProviderPlugin
+
+
+def configured_model() -> Optional[str]:
+    if not (config.azure_openai_account_name and config.azure_openai_deployment and config.azure_openai_api_version):
+        return None
+    return config.azure_openai_deployment
+
+
+plugin = ProviderPlugin(
+    name=LLMProviders.AZURE_OPENAI,
+    label="Azure OpenAI",
+    provider_class="zev.llms.azure_openai.provider:AzureOpenAIProvider",
+    setup_questions="zev.llms.azure_openai.setup:questions",
+    configured_model="zev.llms.azure_openai:configured_model",
+    capabilities=(ProviderCapabilities.BATCHING,),
+)
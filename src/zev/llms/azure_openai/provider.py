@@ -1,11 +1,16 @@
 from openai import AzureOpenAI
 
 from zev.config import config
+from zev.constants import OPENAI_REQUEST_TIMEOUT_SECONDS, LLMProviders
+from zev.llms.azure_openai.token_cache import CachedAzureTokenProvider
 from zev.llms.openai.provider import OpenAIProvider
 
 
 class AzureOpenAIProvider(OpenAIProvider):
+    NAME = LLMProviders.AZURE_OPENAI
     AUTH_ERROR_MESSAGE = "Error: There was an error authenticating with Azure OpenAI. Check Azure credentials or run `zev --setup` again."
+    # older API versions (still allowed by setup) don't support the Responses API
+    USE_RESPONSES_API = False
 
     def __init__(self):
         required_vars = {
@@ -25,22 +30,16 @@ class AzureOpenAIProvider(OpenAIProvider):
                 api_key=config.azure_openai_api_key,
                 azure_endpoint=azure_openai_endpoint,
                 api_version=config.azure_openai_api_version,
+                timeout=OPENAI_REQUEST_TIMEOUT_SECONDS,
             )
         else:
-            try:
-                from azure.identity import (  # pylint: disable=import-outside-toplevel
-                    DefaultAzureCredential,
-                    get_bearer_token_provider,
-                )
-            except ImportError as exc:
-                raise ImportError("Missing required Azure packages. Run `pipx install zev[azure]`") from exc
-            token_provider = get_bearer_token_provider(
-                DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-            )
+            # azure.identity is only imported when the cached token needs refreshing
+            token_provider = CachedAzureTokenProvider(credential_sources=config.azure_credential_sources)
             self.client = AzureOpenAI(
                 azure_endpoint=azure_openai_endpoint,
                 api_version=config.azure_openai_api_version,
                 azure_ad_token_provider=token_provider,
+                timeout=OPENAI_REQUEST_TIMEOUT_SECONDS,
             )
 
         self.model = config.azure_openai_deployment
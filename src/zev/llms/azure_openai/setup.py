@@ -11,6 +11,11 @@ questions = (
         prompt="Azure OpenAI API key (leave blank to use Entra ID / keyless auth):",
         default="",
     ),
+    SetupQuestionText(
+        name="AZURE_CREDENTIAL_SOURCES",
+        prompt="Credential sources for keyless auth, in order (e.g. cli,managed_identity; blank for the default chain):",
+        default="",
+    ),
     SetupQuestionText(
         name="AZURE_OPENAI_DEPLOYMENT",
         prompt="Azure OpenAI deployment name (e.g. gpt-4o, gpt-5.4, gpt-5.4-mini, etc):",
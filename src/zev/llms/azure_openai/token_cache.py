@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from zev.file_utils import atomic_write_lines, file_lock
+from zev.paths import get_azure_token_cache_path
+
+AZURE_COGNITIVE_SERVICES_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+# Cached tokens are refreshed in the background once they're this close to expiring (seconds)...
+REFRESH_MARGIN = 600
+# ...and aren't used at all this close to expiring, since the request itself takes a while
+EXPIRY_MARGIN = 60
+
+# Names accepted in AZURE_CREDENTIAL_SOURCES, mapped to azure.identity credential classes
+CREDENTIAL_SOURCES = {
+    "env": "EnvironmentCredential",
+    "workload_identity": "WorkloadIdentityCredential",
+    "managed_identity": "ManagedIdentityCredential",
+    "shared_cache": "SharedTokenCacheCredential",
+    "vscode": "VisualStudioCodeCredential",
+    "cli": "AzureCliCredential",
+    "powershell": "AzurePowerShellCredential",
+    "azd": "AzureDeveloperCliCredential",
+}
+# Environment variables that pick the identity EnvironmentCredential, WorkloadIdentityCredential and
+# ManagedIdentityCredential sign in as
+IDENTITY_ENV_VARS = ("AZURE_TENANT_ID", "AZURE_CLIENT_ID", "AZURE_USERNAME")
+
+
+def build_credential(sources: Optional[str]):
+    """Build a credential chain from a comma separated list of sources, or DefaultAzureCredential if unset."""
+    try:
+        import azure.identity as identity  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        raise ImportError("Missing required Azure packages. Run `pipx install zev[azure]`") from exc
+
+    names = [name.strip() for name in (sources or "").split(",") if name.strip()]
+    if not names:
+        return identity.DefaultAzureCredential()
+
+    credentials = []
+    for name in names:
+        if name not in CREDENTIAL_SOURCES:
+            raise ValueError(f"Unknown Azure credential source: {name}. Choose from: {', '.join(CREDENTIAL_SOURCES)}.")
+        credentials.append(getattr(identity, CREDENTIAL_SOURCES[name])())
+    return identity.ChainedTokenCredential(*credentials)
+
+
+def get_identity_fingerprint() -> str:
+    """
+    Identifies who the credential chain will sign in as, without running it: the identity environment variables
+    plus the az CLI's active account, read from its profile file. Switching either (e.g. `az login` as someone else
+    or into another tenant) changes the fingerprint, so tokens cached for the previous identity aren't reused.
+    """
+    parts = [os.environ.get(name, "") for name in IDENTITY_ENV_VARS]
+    config_dir = os.environ.get("AZURE_CONFIG_DIR") or Path.home() / ".azure"
+    try:
+        # az writes this file with a BOM
+        with open(Path(config_dir) / "azureProfile.json", "r", encoding="utf-8-sig") as f:
+            subscriptions = json.load(f).get("subscriptions", [])
+        active = next((sub for sub in subscriptions if sub.get("isDefault")), {})
+        parts += [active.get("tenantId", ""), active.get("user", {}).get("name", "")]
+    except (OSError, ValueError, AttributeError):
+        pass
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class CachedAzureTokenProvider:
+    """
+    A bearer token provider for the AzureOpenAI client that keeps tokens in a file in the app dir, so the
+    credential chain (which can take seconds and may shell out to `az`) only runs when a token is about to
+    expire. The file is created by mkstemp, so it's only readable by the current user.
+    """
+
+    def __init__(self, scope: str = AZURE_COGNITIVE_SERVICES_SCOPE, credential_sources: Optional[str] = None):
+        self.path = get_azure_token_cache_path()
+        self.scope = scope
+        self.credential_sources = credential_sources
+        self.key = f"{scope}|{credential_sources or 'default'}|{get_identity_fingerprint()}"
+        self._credential = None
+        self._refresh_lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
+
+    def __call__(self) -> str:
+        cached = self.get_cached_token()
+        if cached is None:
+            return self.refresh()
+
+        token, expires_on = cached
+        if expires_on - time.time() < REFRESH_MARGIN:
+            self._refresh_in_background()
+        return token
+
+    def get_cached_token(self) -> Optional[tuple[str, float]]:
+        """Return (token, expires_on) if there's a cached token that's still safe to use."""
+        try:
+            with file_lock(self.path, shared=True):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)[self.key]
+            token, expires_on = entry["token"], entry["expires_on"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if expires_on - time.time() <= EXPIRY_MARGIN:
+            return None
+        return token, expires_on
+
+    def refresh_if_expiring(self, within: float) -> None:
+        """Refresh the cached token if it expires in the next `within` seconds, so runs in that time don't wait."""
+        cached = self.get_cached_token()
+        if cached is None or cached[1] - time.time() < within:
+            self.refresh()
+
+    def refresh(self) -> str:
+        with self._refresh_lock:
+            if self._credential is None:
+                self._credential = build_credential(self.credential_sources)
+            access_token = self._credential.get_token(self.scope)
+            self._write(access_token.token, access_token.expires_on)
+            return access_token.token
+
+    def _refresh_in_background(self) -> None:
+        if self._background_refresh and self._background_refresh.is_alive():
+            return
+
+        def _refresh():
+            try:
+                self.refresh()
+            except Exception:
+                pass  # the cached token is still valid, the next run will try again
+
+        self._background_refresh = threading.Thread(target=_refresh, daemon=True)
+        self._background_refresh.start()
+
+    def _write(self, token: str, expires_on: float) -> None:
+        with file_lock(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            now = time.time()
+            data = {key: entry for key, entry in data.items() if entry.get("expires_on", 0) > now}
+            data[self.key] = {"token": token, "expires_on": expires_on}
+            atomic_write_lines(self.path, [json.dumps(data)])
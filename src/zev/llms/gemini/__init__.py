@@ -0,0 +1,21 @@
+from typing import Optional
+
+from zev.config import config
+from zev.constants import GEMINI_DEFAULT_MODEL, LLMProviders, ProviderCapabilities
+from zev.llms.plugins import ProviderPlugin
+
+
+def configured_model() -> Optional[str]:
+    if not config.gemini_api_key:
+        return None
+    return config.gemini_model or GEMINI_DEFAULT_MODEL
+
+
+plugin = ProviderPlugin(
+    name=LLMProviders.GEMINI,
+    label="Gemini",
+    provider_class="zev.llms.gemini.provider:GeminiProvider",
+    setup_questions="zev.llms.gemini.setup:questions",
+    configured_model="zev.llms.gemini:configured_model",
+    capabilities=(ProviderCapabilities.BATCHING,),
+)
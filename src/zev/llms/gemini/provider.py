@@ -1,11 +1,20 @@
+import http.client
 import json
-import urllib.error
-import urllib.request
+import socket
+from typing import Optional
+from urllib.parse import urlsplit
 
 from zev.config import config
-from zev.constants import GEMINI_BASE_URL, GEMINI_DEFAULT_MODEL, PROMPT
+from zev.constants import (
+    GEMINI_BASE_URL,
+    GEMINI_DEFAULT_MODEL,
+    GEMINI_REQUEST_TIMEOUT_SECONDS,
+    PROMPT,
+    LLMProviders,
+)
 from zev.llms.inference_provider_base import InferenceProvider
-from zev.llms.types import OptionsResponse
+from zev.llms.profiles import gemini_generation_config
+from zev.llms.types import OptionsResponse, TokenUsage
 
 GEMINI_RESPONSE_SCHEMA = {
     "response_mime_type": "application/json",
@@ -41,37 +50,80 @@ GEMINI_RESPONSE_SCHEMA = {
 
 
 class GeminiProvider(InferenceProvider):
+    NAME = LLMProviders.GEMINI
+
     def __init__(self):
         if not config.gemini_api_key:
             raise ValueError("GEMINI_API_KEY must be set. Try running `zev --setup`.")
 
         self.model = config.gemini_model or GEMINI_DEFAULT_MODEL
-        self.api_url = f"{GEMINI_BASE_URL}/v1beta/models/{self.model}:generateContent?key={config.gemini_api_key}"
+        self.host = urlsplit(GEMINI_BASE_URL).netloc
+        self.api_path = f"/v1beta/models/{self.model}:generateContent?key={config.gemini_api_key}"
+        # The request in flight, so `cancel` can close its socket from another thread
+        self._connection: Optional[http.client.HTTPSConnection] = None
+
+    def get_options(self, prompt: str, context: str) -> OptionsResponse | None:
+        responses = self._generate(prompt, context, candidate_count=1)
+        return responses[0] if responses else None
 
-    def get_options(self, prompt: str, context: str) -> None:
+    def get_more_options(self, prompt: str, context: str, samples: int) -> list[OptionsResponse]:
+        return self._generate(prompt, context, candidate_count=samples) or []
+
+    def _generate(self, prompt: str, context: str, candidate_count: int) -> list[OptionsResponse] | None:
         assembled_prompt = PROMPT.format(prompt=prompt, context=context)
         headers = {"Content-Type": "application/json"}
+        generation_config = {**GEMINI_RESPONSE_SCHEMA, **gemini_generation_config(self.model, self.profile)}
+        if candidate_count > 1:
+            generation_config["candidateCount"] = candidate_count
         body = json.dumps(
             {
                 "contents": [{"parts": [{"text": assembled_prompt}]}],
-                "generationConfig": GEMINI_RESPONSE_SCHEMA,
+                "generationConfig": generation_config,
             }
         ).encode("utf-8")
-        request = urllib.request.Request(self.api_url, data=body, headers=headers, method="POST")
+        self.last_usage = None
 
+        connection = http.client.HTTPSConnection(self.host, timeout=GEMINI_REQUEST_TIMEOUT_SECONDS)
+        self._connection = connection
         try:
-            with urllib.request.urlopen(request) as response:
-                data = json.loads(response.read().decode())
-                text_output = data["candidates"][0]["content"]["parts"][0]["text"]
-                parsed_json = json.loads(text_output)
-                return OptionsResponse(**parsed_json)
-        except urllib.error.HTTPError as e:
-            try:
-                error_data = json.loads(e.read().decode())
-                print("Error:", error_data["error"]["message"])
-            except Exception:
-                print("HTTP Error:", e.code)
-            print("Note that to update settings, you can run `zev --setup`.")
+            connection.request("POST", self.api_path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            if response.status >= 400:
+                try:
+                    error_data = json.loads(payload.decode())
+                    print("Error:", error_data["error"]["message"])
+                except Exception:
+                    print("HTTP Error:", response.status)
+                print("Note that to update settings, you can run `zev --setup`.")
+                return None
+
+            data = json.loads(payload.decode())
+            usage = data.get("usageMetadata", {})
+            self.last_usage = TokenUsage(
+                input_tokens=usage.get("promptTokenCount", 0),
+                # thinking tokens are billed as output
+                output_tokens=usage.get("candidatesTokenCount", 0) + usage.get("thoughtsTokenCount", 0),
+            )
+            return [
+                OptionsResponse(**json.loads(candidate["content"]["parts"][0]["text"]))
+                for candidate in data["candidates"]
+            ]
         except Exception as e:
-            print(f"Unexpected error: {e}")
+            # A cancelled request fails when its socket is closed; nobody is waiting for it anymore
+            if self._connection is connection:
+                print(f"Unexpected error: {e}")
+        finally:
+            if self._connection is connection:
+                self._connection = None
+            connection.close()
         return None
+
+    def cancel(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None and connection.sock is not None:
+            try:
+                # shutdown wakes up a thread blocked reading the socket, which close alone doesn't
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -3,6 +3,8 @@ from zev.config.types import (
     SetupQuestionSelectOption,
     SetupQuestionText,
 )
+from zev.constants import LLMProviders
+from zev.llms.model_probe import ModelProbe
 
 questions = (
     SetupQuestionText(
@@ -13,6 +15,7 @@ questions = (
     SetupQuestionSelect(
         name="GEMINI_MODEL",
         prompt="Choose which model you would like to default to:",
+        probe=ModelProbe(LLMProviders.GEMINI, "GEMINI_MODEL"),
         options=[
             SetupQuestionSelectOption(
                 value="gemini-3-flash-preview",
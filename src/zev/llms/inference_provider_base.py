@@ -1,9 +1,67 @@
-from zev.llms.types import OptionsResponse
+import copy
+
+from zev.constants import DEFAULT_PROFILE, REFINE_TRANSCRIPT_PROMPT
+from zev.inflight import InFlightCall
+from zev.llms.types import ConversationTurn, OptionsResponse, OptionsSample, TokenUsage
 
 
 class InferenceProvider:
+    NAME: str = ""  # the LLMProviders value this provider is configured with
+    profile: str = DEFAULT_PROFILE  # see zev.llms.profiles
+
+    # id of the last response, for providers that can continue a conversation server-side
+    last_response_id: str | None = None
+    # token counts reported for the last request, if the provider returns them
+    last_usage: TokenUsage | None = None
+
     def __init__(self):
         raise NotImplementedError("Subclasses must implement this method")
 
     def get_options(self, prompt: str, context: str) -> OptionsResponse | None:
         raise NotImplementedError("Subclasses must implement this method")
+
+    def get_more_options(self, prompt: str, context: str, samples: int) -> list[OptionsResponse]:
+        """
+        Get several independent answers to the same prompt. Providers that can return multiple candidates from
+        one request override this; the default sends the requests in parallel. Afterwards `last_usage` is the
+        total over all of them, and there's no `last_response_id`, since no one response continues from here.
+        """
+        # Daemon threads rather than a ThreadPoolExecutor, whose threads would hold up exit after a cancel
+        calls = [InFlightCall(lambda: self.sample_options(prompt=prompt, context=context)) for _ in range(samples)]
+        for call in calls:
+            call.wait(None)
+        results = [call.result() for call in calls]
+        self.last_usage = TokenUsage.total([result.usage for result in results])
+        self.last_response_id = None
+        return [result.response for result in results if result.response is not None]
+
+    def sample_options(self, prompt: str, context: str) -> OptionsSample:
+        """
+        One answer for `get_more_options`, which calls this from several threads at once. The default asks a copy
+        of the provider, so each request's usage and response id stay separate; providers that can return them
+        directly override this.
+        """
+        provider = copy.copy(self)
+        response = provider.get_options(prompt=prompt, context=context)
+        return OptionsSample(response=response, usage=provider.last_usage, response_id=provider.last_response_id)
+
+    def cancel(self) -> None:
+        """
+        Abort the request in flight, if the provider can. Called from the main thread while a worker thread is
+        waiting on the request; whatever that request returns or raises is discarded.
+        """
+
+    def refine_options(self, follow_up: str, context: str, turns: list[ConversationTurn]) -> OptionsResponse | None:
+        """
+        Ask for new options based on a follow-up to the previous turns. Providers without server-side
+        conversation state send a compact transcript (the queries and previously suggested commands) instead.
+        """
+        query = turns[0].query
+        for turn, next_turn in zip(turns, turns[1:] + [None]):
+            previous_commands = ", ".join(f"`{cmd.command}`" for cmd in turn.response.commands) or "nothing"
+            query = REFINE_TRANSCRIPT_PROMPT.format(
+                query=query,
+                previous_commands=previous_commands,
+                follow_up=next_turn.query if next_turn else follow_up,
+            )
+        return self.get_options(prompt=query, context=context)
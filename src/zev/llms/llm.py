@@ -1,28 +1,59 @@
+from typing import Optional
+
 from zev.config import config
-from zev.constants import LLMProviders
+from zev.constants import DEFAULT_PROFILE, LLMProviders
+from zev.latency_stats import LatencyStats
 from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.plugins import get_plugin, get_plugins
+from zev.llms.profiles import validate_profile
+
+
+def get_configured_models() -> dict[str, str]:
+    """Map each provider that has its required settings in the config to the model it would use."""
+    configured = {}
+    for name, plugin in get_plugins().items():
+        model = plugin.get_configured_model()
+        if model:
+            configured[name] = model
+    return configured
+
+
+def pick_fastest_provider() -> str:
+    configured = get_configured_models()
+    if not configured:
+        raise ValueError("LLM_PROVIDER is auto, but no providers are set up. Run `zev --setup` for each provider.")
+    provider, _ = LatencyStats().pick_fastest(list(configured.items()))
+    return provider
+
+
+def get_fallback_backend(current: InferenceProvider) -> Optional[tuple[str, str]]:
+    """The other configured (provider, model) with the best recent latency, to reroute a request that's running slow."""
+    others = [(name, model) for name, model in get_configured_models().items() if name != current.NAME]
+    if not others:
+        return None
+
+    latency_stats = LatencyStats()
+
+    def score(candidate: tuple[str, str]) -> float:
+        summary = latency_stats.summary(*candidate)
+        return summary.score if summary else float("inf")
 
+    return min(others, key=score)
 
-def get_inference_provider() -> InferenceProvider:
-    if config.llm_provider == LLMProviders.OPENAI:
-        # pylint: disable=import-outside-toplevel
-        from zev.llms.openai.provider import OpenAIProvider
 
-        return OpenAIProvider()
-    elif config.llm_provider == LLMProviders.OLLAMA:
-        # pylint: disable=import-outside-toplevel
-        from zev.llms.ollama.provider import OllamaProvider
+def get_inference_provider(profile: Optional[str] = None, llm_provider: Optional[str] = None) -> InferenceProvider:
+    """Create the configured provider, or `llm_provider` instead if given."""
+    inference_provider = _create_inference_provider(llm_provider or config.llm_provider)
+    inference_provider.profile = validate_profile(profile or config.profile or DEFAULT_PROFILE)
+    return inference_provider
 
-        return OllamaProvider()
-    elif config.llm_provider == LLMProviders.GEMINI:
-        # pylint: disable=import-outside-toplevel
-        from zev.llms.gemini.provider import GeminiProvider
 
-        return GeminiProvider()
-    elif config.llm_provider == LLMProviders.AZURE_OPENAI:
-        # pylint: disable=import-outside-toplevel
-        from zev.llms.azure_openai.provider import AzureOpenAIProvider
+def _create_inference_provider(llm_provider: str) -> InferenceProvider:
+    if llm_provider == LLMProviders.AUTO:
+        llm_provider = pick_fastest_provider()
 
-        return AzureOpenAIProvider()
-    else:
-        raise ValueError(f"Invalid LLM provider: {config.llm_provider}")
+    # Only the selected provider's module gets imported
+    plugin = get_plugin(llm_provider)
+    if plugin is None:
+        raise ValueError(f"Invalid LLM provider: {llm_provider}")
+    return plugin.load_provider_class()()
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional
+
+from rich.console import Console
+
+from zev.config import config
+from zev.config.types import SetupProbe
+from zev.llms.types import OptionsResponse, TokenUsage
+from zev.paths import get_probe_results_path
+from zev.utils import get_env_context
+
+# A few short, representative queries. Kept fixed so results from different runs can be compared.
+PROBE_QUERIES = (
+    "list all files in the current directory including hidden ones",
+    "find files larger than 100MB",
+    "show which process is listening on port 8080",
+)
+
+
+@dataclass
+class ProbeResult:
+    model: str
+    latencies: list[float] = field(default_factory=list)
+    valid: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    errors: int = 0
+
+    @property
+    def median_latency(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return sorted(self.latencies)[len(self.latencies) // 2]
+
+    def add(self, latency: float, response: OptionsResponse, usage: Optional[TokenUsage]) -> None:
+        self.latencies.append(latency)
+        self.valid += int(response.is_valid and bool(response.commands))
+        if usage:
+            self.input_tokens += usage.input_tokens
+            self.output_tokens += usage.output_tokens
+
+    def describe(self) -> str:
+        if self.median_latency is None:
+            return "probe failed"
+        # Failed calls report no usage, so average over the ones that answered
+        tokens = (self.input_tokens + self.output_tokens) // len(self.latencies)
+        description = (
+            f"measured: {self.median_latency:.1f}s, ~{tokens} tokens/query, {self.valid}/{len(PROBE_QUERIES)} valid"
+        )
+        if self.errors:
+            description += f", {self.errors} failed"
+        return description
+
+
+_config_lock = threading.Lock()
+
+
+@contextmanager
+def _config_overrides(values: Dict[str, str]):
+    """Providers read their settings from `config`, so probe with the answers given so far swapped in."""
+    with _config_lock:
+        original = config.vals
+        config.vals = {**original, **values}
+        try:
+            yield
+        finally:
+            config.vals = original
+
+
+class ModelProbe(SetupProbe):
+    """Checks the credentials entered so far, then times each candidate model on PROBE_QUERIES in parallel."""
+
+    def __init__(self, provider: str, setting_name: str):
+        self.provider = provider
+        self.setting_name = setting_name
+        self.results: Dict[str, ProbeResult] = {}
+
+    def run(self, answers: Dict[str, str], values: list[str]) -> Dict[str, str]:
+        # pylint: disable=import-outside-toplevel
+        from zev.llms.llm import get_inference_provider
+
+        context = get_env_context()
+        overrides = {**answers, "LLM_PROVIDER": self.provider}
+        self.results = {value: ProbeResult(model=value) for value in values}
+
+        def _run_query(model: str, query: str) -> Optional[tuple[float, OptionsResponse, Optional[TokenUsage]]]:
+            """Returns (latency, response, usage), or None if the call failed. Results are tallied by the caller."""
+            try:
+                # One provider per call, since providers keep per-request state like last_usage
+                with _config_overrides({**overrides, self.setting_name: model}):
+                    inference_provider = get_inference_provider()
+                start = time.monotonic()
+                response = inference_provider.get_options(prompt=query, context=context)
+                latency = time.monotonic() - start
+            except Exception:
+                return None
+            if response is None:
+                return None
+            return latency, response, inference_provider.last_usage
+
+        console = Console()
+        with console.status("[bold blue]Checking credentials...", spinner="dots"):
+            checked = _run_query(values[0], PROBE_QUERIES[0])
+        if checked is None:
+            print("Could not get a response with these settings. Check your credentials; skipping the benchmark.")
+            self.results = {}
+            return {}
+
+        with console.status("[bold blue]Benchmarking models...", spinner="dots"):
+            with ThreadPoolExecutor(max_workers=len(values) * len(PROBE_QUERIES)) as executor:
+                futures = {
+                    executor.submit(_run_query, model, query): model for model in values for query in PROBE_QUERIES
+                }
+                # Tallied here on the main thread, so results are never updated by two workers at once
+                for future in as_completed(futures):
+                    sample = future.result()
+                    if sample is None:
+                        self.results[futures[future]].errors += 1
+                    else:
+                        self.results[futures[future]].add(*sample)
+
+        return {value: result.describe() for value, result in self.results.items()}
+
+    def save(self, chosen: str) -> None:
+        timestamp = time.time()
+        with open(get_probe_results_path(), "a", encoding="utf-8") as f:
+            for value, result in self.results.items():
+                record = {"timestamp": timestamp, "provider": self.provider, "chosen": value == chosen}
+                record.update(asdict(result))
+                f.write(json.dumps(record) + "\n")
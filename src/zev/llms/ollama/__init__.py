@@ -0,0 +1,21 @@
+from typing import Optional
+
+from zev.config import config
+from zev.constants import LLMProviders, ProviderCapabilities
+from zev.llms.plugins import ProviderPlugin
+
+
+def configured_model() -> Optional[str]:
+    if not (config.ollama_base_url and config.ollama_model):
+        return None
+    return config.ollama_model
+
+
+plugin = ProviderPlugin(
+    name=LLMProviders.OLLAMA,
+    label="Ollama",
+    provider_class="zev.llms.ollama.provider:OllamaProvider",
+    setup_questions="zev.llms.ollama.setup:questions",
+    configured_model="zev.llms.ollama:configured_model",
+    capabilities=(ProviderCapabilities.BATCHING,),
+)
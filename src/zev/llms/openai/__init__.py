@@ -0,0 +1,20 @@
+from typing import Optional
+
+from zev.config import config
+from zev.constants import OPENAI_DEFAULT_MODEL, LLMProviders
+from zev.llms.plugins import ProviderPlugin
+
+
+def configured_model() -> Optional[str]:
+    if not config.openai_api_key:
+        return None
+    return config.openai_model or OPENAI_DEFAULT_MODEL
+
+
+plugin = ProviderPlugin(
+    name=LLMProviders.OPENAI,
+    label="OpenAI",
+    provider_class="zev.llms.openai.provider:OpenAIProvider",
+    setup_questions="zev.llms.openai.setup:questions",
+    configured_model="zev.llms.openai:configured_model",
+)
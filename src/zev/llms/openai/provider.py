@@ -1,32 +1,124 @@
-from openai import AuthenticationError, OpenAI
+from openai import AuthenticationError, DefaultHttpxClient, OpenAI
 
 from zev.config import config
-from zev.constants import OPENAI_BASE_URL, OPENAI_DEFAULT_MODEL, PROMPT
+from zev.constants import (
+    OPENAI_BASE_URL,
+    OPENAI_DEFAULT_MODEL,
+    OPENAI_REQUEST_TIMEOUT_SECONDS,
+    PROMPT,
+    REFINE_PROMPT,
+    LLMProviders,
+)
 from zev.llms.inference_provider_base import InferenceProvider
-from zev.llms.types import OptionsResponse
+from zev.llms.profiles import openai_request_params
+from zev.llms.types import ConversationTurn, OptionsResponse, OptionsSample, TokenUsage
 
 
 class OpenAIProvider(InferenceProvider):
+    NAME = LLMProviders.OPENAI
     AUTH_ERROR_MESSAGE = (
         "Error: There was an error with your OpenAI API key. You can change it by running `zev --setup`."
     )
+    # The Responses API lets follow-ups reference the previous response instead of resending the prompt.
+    # Subclasses pointing at OpenAI-compatible servers without it fall back to chat completions.
+    USE_RESPONSES_API = True
 
     def __init__(self):
         if not config.openai_api_key:
             raise ValueError("OPENAI_API_KEY must be set. Try running `zev --setup`.")
 
-        self.client = OpenAI(base_url=OPENAI_BASE_URL, api_key=config.openai_api_key)
+        self.client = OpenAI(
+            base_url=OPENAI_BASE_URL, api_key=config.openai_api_key, timeout=OPENAI_REQUEST_TIMEOUT_SECONDS
+        )
         self.model = config.openai_model or OPENAI_DEFAULT_MODEL
 
     def get_options(self, prompt: str, context: str) -> OptionsResponse | None:
+        return self._remember(self.sample_options(prompt, context))
+
+    def sample_options(self, prompt: str, context: str) -> OptionsSample:
+        return self._parse(PROMPT.format(prompt=prompt, context=context))
+
+    def get_more_options(self, prompt: str, context: str, samples: int) -> list[OptionsResponse]:
+        # The Responses API has no `n`, but chat completions can return several choices from one request
+        if self.USE_RESPONSES_API:
+            return super().get_more_options(prompt, context, samples)
+
+        assembled_prompt = PROMPT.format(prompt=prompt, context=context)
+        self.last_usage = None
+        self.last_response_id = None
         try:
-            assembled_prompt = PROMPT.format(prompt=prompt, context=context)
             response = self.client.beta.chat.completions.parse(
                 model=self.model,
                 messages=[{"role": "user", "content": assembled_prompt}],
                 response_format=OptionsResponse,
+                n=samples,
+                **openai_request_params(self.model, self.profile, responses_api=False),
+            )
+        except AuthenticationError:
+            print(self.AUTH_ERROR_MESSAGE)
+            return []
+        if response.usage:
+            self.last_usage = TokenUsage(
+                input_tokens=response.usage.prompt_tokens, output_tokens=response.usage.completion_tokens
+            )
+        return [choice.message.parsed for choice in response.choices if choice.message.parsed]
+
+    def refine_options(self, follow_up: str, context: str, turns: list[ConversationTurn]) -> OptionsResponse | None:
+        previous_response_id = turns[-1].response_id
+        if not self.USE_RESPONSES_API or not previous_response_id:
+            return super().refine_options(follow_up, context, turns)
+        return self._remember(
+            self._parse(REFINE_PROMPT.format(follow_up=follow_up), previous_response_id=previous_response_id)
+        )
+
+    def cancel(self) -> None:
+        # httpx can't interrupt a request that's already waiting for its reply. The abandoned request keeps its
+        # daemon thread until it finishes or hits OPENAI_REQUEST_TIMEOUT_SECONDS, and its result is dropped.
+        # Requests after this (in a session) go through a copy of the client with a fresh connection pool, and
+        # the old client is closed so its connections are released.
+        client = self.client
+        self.client = client.copy(http_client=DefaultHttpxClient())
+        client.close()
+
+    def _remember(self, sample: OptionsSample) -> OptionsResponse | None:
+        self.last_usage = sample.usage
+        self.last_response_id = sample.response_id
+        return sample.response
+
+    def _parse(self, content: str, previous_response_id: str | None = None) -> OptionsSample:
+        """Make one request. Safe to call from several threads, since it doesn't touch per-request state."""
+        messages = [{"role": "user", "content": content}]
+        try:
+            if self.USE_RESPONSES_API:
+                kwargs = openai_request_params(self.model, self.profile, responses_api=True)
+                if previous_response_id:
+                    kwargs["previous_response_id"] = previous_response_id
+                response = self.client.responses.parse(
+                    model=self.model,
+                    input=messages,
+                    text_format=OptionsResponse,
+                    store=True,
+                    **kwargs,
+                )
+                usage = None
+                if response.usage:
+                    usage = TokenUsage(
+                        input_tokens=response.usage.input_tokens, output_tokens=response.usage.output_tokens
+                    )
+                return OptionsSample(response=response.output_parsed, usage=usage, response_id=response.id)
+
+            response = self.client.beta.chat.completions.parse(
+                model=self.model,
+                messages=messages,
+                response_format=OptionsResponse,
+                **openai_request_params(self.model, self.profile, responses_api=False),
             )
-            return response.choices[0].message.parsed
+            usage = None
+            if response.usage:
+                usage = TokenUsage(
+                    input_tokens=response.usage.prompt_tokens, output_tokens=response.usage.completion_tokens
+                )
+            return OptionsSample(response=response.choices[0].message.parsed, usage=usage)
         except AuthenticationError:
             print(self.AUTH_ERROR_MESSAGE)
-            return None
+            return OptionsSample()
@@ -3,6 +3,8 @@ from zev.config.types import (
     SetupQuestionSelectOption,
     SetupQuestionText,
 )
+from zev.constants import LLMProviders
+from zev.llms.model_probe import ModelProbe
 
 questions = (
     SetupQuestionText(
@@ -13,6 +15,7 @@ questions = (
     SetupQuestionSelect(
         name="OPENAI_MODEL",
         prompt="Choose which model you would like to default to:",
+        probe=ModelProbe(LLMProviders.OPENAI, "OPENAI_MODEL"),
         options=[
             SetupQuestionSelectOption(
                 value="gpt-5.4-mini",
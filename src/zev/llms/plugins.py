@@ -0,0 +1,134 @@
+import importlib
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from zev.constants import PROVIDER_PLUGIN_GROUP
+from zev.file_utils import atomic_write_lines
+from zev.paths import get_plugin_index_path
+
+# Bump when ProviderPlugin changes so cached indexes are rebuilt
+PLUGIN_INDEX_VERSION = 1
+
+# The providers that ship with zev, registered the same way as plugins but without needing package metadata
+BUILTIN_PLUGINS = (
+    "zev.llms.openai:plugin",
+    "zev.llms.ollama:plugin",
+    "zev.llms.gemini:plugin",
+    "zev.llms.azure_openai:plugin",
+)
+
+
+def load_object(reference: str) -> Any:
+    """Import `package.module:attribute` and return the attribute."""
+    module_name, _, attribute = reference.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+@dataclass(frozen=True)
+class ProviderPlugin:
+    """
+    Describes an LLM backend. Everything else is referenced as `package.module:attribute` strings, so the plugin
+    can be listed without importing its provider or setup code.
+    """
+
+    name: str  # the LLM_PROVIDER value that selects it
+    label: str  # shown in `zev --setup`
+    provider_class: str  # an InferenceProvider subclass, constructed without arguments
+    setup_questions: str = ""  # a sequence of SetupQuestions asked when the provider is picked in setup
+    configured_model: str = ""  # a function returning the model that would be used, or None if not set up
+    description: Optional[str] = None
+    capabilities: tuple[str, ...] = field(default=())  # see ProviderCapabilities
+
+    def load_provider_class(self) -> type:
+        return load_object(self.provider_class)
+
+    def load_setup_questions(self) -> tuple:
+        return tuple(load_object(self.setup_questions)) if self.setup_questions else ()
+
+    def get_configured_model(self) -> Optional[str]:
+        if not self.configured_model:
+            return None
+        get_model: Callable[[], Optional[str]] = load_object(self.configured_model)
+        return get_model()
+
+
+def get_environment_fingerprint() -> list:
+    """
+    Installing or removing a distribution changes the mtime of the directory it's installed into, so this changes
+    whenever the available plugins might have, without listing any directory.
+    """
+    fingerprint = []
+    paths = [*sys.path, *(str(path) for path in Path(__file__).parent.glob("*/__init__.py"))]
+    for path in paths:
+        if not path:
+            continue  # the current directory; its mtime changes too often to be useful
+        try:
+            fingerprint.append([path, os.stat(path).st_mtime_ns])
+        except OSError:
+            continue
+    return fingerprint
+
+
+def discover_plugins() -> list[ProviderPlugin]:
+    """Load the built-in plugins and every plugin registered under the entry point group. Slow; use get_plugins."""
+    plugins = {}
+    references = [(reference, reference) for reference in BUILTIN_PLUGINS]
+    references += [(entry_point.name, entry_point.value) for entry_point in entry_points(group=PROVIDER_PLUGIN_GROUP)]
+    for name, reference in references:
+        try:
+            plugin = load_object(reference)
+        except Exception as e:
+            print(f"Could not load zev provider plugin {name}: {e}")
+            continue
+        if not isinstance(plugin, ProviderPlugin):
+            print(f"Ignoring zev provider plugin {name}: {reference} is not a ProviderPlugin")
+            continue
+        # Built-ins come first, so a plugin can't silently replace one
+        plugins.setdefault(plugin.name, plugin)
+    return list(plugins.values())
+
+
+_plugins: Optional[dict[str, ProviderPlugin]] = None
+
+
+def get_plugins() -> dict[str, ProviderPlugin]:
+    """All available plugins by name, from the cached index unless installed packages changed since it was built."""
+    global _plugins
+    if _plugins is not None:
+        return _plugins
+
+    index_path = get_plugin_index_path()
+    fingerprint = get_environment_fingerprint()
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["version"] == PLUGIN_INDEX_VERSION and index["fingerprint"] == fingerprint:
+            _plugins = {
+                plugin["name"]: ProviderPlugin(**{**plugin, "capabilities": tuple(plugin["capabilities"])})
+                for plugin in index["plugins"]
+            }
+            return _plugins
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    plugins = discover_plugins()
+    index = {
+        "version": PLUGIN_INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "plugins": [asdict(plugin) for plugin in plugins],
+    }
+    try:
+        atomic_write_lines(index_path, [json.dumps(index)])
+    except OSError:
+        pass
+    _plugins = {plugin.name: plugin for plugin in plugins}
+    return _plugins
+
+
+def get_plugin(name: Optional[str]) -> Optional[ProviderPlugin]:
+    return get_plugins().get(name) if name else None
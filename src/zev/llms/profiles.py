@@ -0,0 +1,71 @@
+"""
+Latency profiles map a single setting onto each provider's knobs for reasoning effort, verbosity and output
+length. `balanced` leaves the provider defaults alone, `fast` turns thinking down as far as the model allows
+and `thorough` turns it up. Parameters are only sent to models known to accept them.
+"""
+
+import re
+from typing import Optional
+
+from zev.constants import Profiles
+
+PROFILES = (Profiles.FAST, Profiles.BALANCED, Profiles.THOROUGH)
+
+# Reasoning tokens count towards the cap, so this leaves plenty of room over the ~300 token answer
+FAST_MAX_OUTPUT_TOKENS = 2048
+
+
+def validate_profile(profile: str) -> str:
+    if profile not in PROFILES:
+        raise ValueError(f"Invalid profile: {profile}. Choose from: {', '.join(PROFILES)}.")
+    return profile
+
+
+def _openai_reasoning_effort(model: str, profile: str) -> Optional[str]:
+    if profile == Profiles.BALANCED:
+        return None
+    if re.match(r"gpt-5\.\d", model):
+        # gpt-5.1 and later can skip reasoning entirely
+        return "none" if profile == Profiles.FAST else "high"
+    if model.startswith("gpt-5"):
+        return "minimal" if profile == Profiles.FAST else "high"
+    if re.match(r"o\d", model):
+        return "low" if profile == Profiles.FAST else "high"
+    return None  # not a reasoning model, the parameter would be rejected
+
+
+def openai_request_params(model: str, profile: str, responses_api: bool) -> dict:
+    """Extra keyword arguments for `responses.parse` (or `chat.completions.parse`) for a profile."""
+    effort = _openai_reasoning_effort(model, profile)
+    if effort is None:
+        return {}
+
+    if not responses_api:
+        params = {"reasoning_effort": effort}
+        if profile == Profiles.FAST:
+            params["max_completion_tokens"] = FAST_MAX_OUTPUT_TOKENS
+        return params
+
+    params = {"reasoning": {"effort": effort}}
+    if profile == Profiles.FAST:
+        params["max_output_tokens"] = FAST_MAX_OUTPUT_TOKENS
+        if model.startswith("gpt-5"):
+            params["text"] = {"verbosity": "low"}
+    return params
+
+
+def gemini_generation_config(model: str, profile: str) -> dict:
+    """Extra `generationConfig` fields for a profile."""
+    if profile == Profiles.BALANCED:
+        return {}
+
+    config = {"maxOutputTokens": FAST_MAX_OUTPUT_TOKENS} if profile == Profiles.FAST else {}
+    if model.startswith("gemini-3"):
+        # Pro models only support low and high
+        fast_level = "low" if "pro" in model else "minimal"
+        config["thinkingConfig"] = {"thinkingLevel": fast_level if profile == Profiles.FAST else "high"}
+    elif model.startswith("gemini-2.5"):
+        # Pro models can't turn thinking off, 128 is their minimum budget
+        fast_budget = 128 if "pro" in model else 0
+        config["thinkingConfig"] = {"thinkingBudget": fast_budget if profile == Profiles.FAST else -1}
+    return config
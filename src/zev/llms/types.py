@@ -14,3 +14,33 @@ class OptionsResponse(BaseModel):
     commands: list[Command]
     is_valid: bool
     explanation_if_not_valid: Optional[str] = None
+
+
+class TokenUsage(BaseModel):
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @classmethod
+    def total(cls, usages: list[Optional["TokenUsage"]]) -> Optional["TokenUsage"]:
+        """The sum of the reported usages, or None if none were reported."""
+        reported = [usage for usage in usages if usage is not None]
+        if not reported:
+            return None
+        return cls(
+            input_tokens=sum(usage.input_tokens for usage in reported),
+            output_tokens=sum(usage.output_tokens for usage in reported),
+        )
+
+
+class OptionsSample(BaseModel):
+    """One answer together with the usage and response id of the request that produced it."""
+
+    response: Optional[OptionsResponse] = None
+    usage: Optional[TokenUsage] = None
+    response_id: Optional[str] = None
+
+
+class ConversationTurn(BaseModel):
+    query: str
+    response: OptionsResponse
+    response_id: Optional[str] = None  # set when the provider keeps the conversation server-side
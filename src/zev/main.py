@@ -1,56 +1,491 @@
 import sys
+import time
 
-import dotenv
+import questionary
 from rich import print as rprint
 from rich.console import Console
+from rich.markup import escape
 
+from zev import maintenance
+from zev.cache.response_cache import ResponseCache, get_response_cache
 from zev.command_history import CommandHistory
 from zev.command_selector import show_options
 from zev.config import config
 from zev.config.setup import run_setup
-from zev.llms.llm import get_inference_provider
+from zev.constants import DEFAULT_PROFILE, EXPLAIN_QUERY
+from zev.explain.explainer import explain, print_explanation
+from zev.inflight import InFlightCall
+from zev.latency_stats import LatencyStats, LatencySummary
+from zev.llms.inference_provider_base import InferenceProvider
+from zev.llms.llm import get_fallback_backend, get_inference_provider
+from zev.llms.profiles import PROFILES, validate_profile
+from zev.llms.types import Command, ConversationTurn, OptionsResponse
+from zev.offline.knowledge_base import search as search_offline
 from zev.paths import get_config_path, migrate_legacy_files
-from zev.update_check import check_for_updates_in_background, get_update_message
+from zev.query import InvalidQuery, prepare_query
+from zev.ranking import normalize_command, rank_commands
+from zev.rate_governor import ESTIMATED_TOKENS_PER_CALL, RateLimitExceeded, get_rate_governor, is_interactive
+from zev.update_check import get_update_message
 from zev.utils import get_env_context, get_input_string, show_help
 
+# How many answers to sample when the user asks for more options
+MORE_OPTIONS_SAMPLES = 3
+# How often the status line updates while waiting on the model; also how quickly Ctrl-C is noticed on Windows
+STATUS_REFRESH_SECONDS = 0.1
+# When a backend's usual latency isn't known yet, how long a call takes before it counts as slow
+SLOW_CALL_DEFAULT_SECONDS = 15
+SWITCH_BACKEND = "switch"
+KEEP_WAITING = "wait"
+
+console = Console()
 command_history = CommandHistory()
+latency_stats = LatencyStats()
+# (label, seconds) for each step of the current query, printed with --timings
+query_timings: list[tuple[str, float]] = []
 
 
 def setup():
     run_setup()
 
 
-def get_options(words: str):
+class SwitchBackend(Exception):
+    """The user chose to reroute a slow call. The caller should make it again with `inference_provider`."""
+
+    def __init__(self, inference_provider: InferenceProvider) -> None:
+        super().__init__(f"Switched to {inference_provider.NAME}")
+        self.inference_provider = inference_provider
+
+
+def fetch_options(
+    inference_provider: InferenceProvider, response_cache: ResponseCache | None, words: str, context: str
+) -> tuple[OptionsResponse | None, str | None]:
+    """
+    Returns the options and the id of the response they came in, for providers that continue conversations
+    server-side. A cached answer has no id, since the response it came from belongs to an earlier process.
+    """
+    if response_cache is not None:
+        response = response_cache.get(
+            words, provider=inference_provider.NAME, model=inference_provider.model, profile=inference_provider.profile
+        )
+        if response is not None:
+            return response, None
+
+    response = call_provider(inference_provider, "get_options", prompt=words, context=context)
+    if response is not None and response_cache is not None:
+        response_cache.set(
+            words,
+            provider=inference_provider.NAME,
+            model=inference_provider.model,
+            profile=inference_provider.profile,
+            response=response,
+        )
+    return response, inference_provider.last_response_id
+
+
+def call_provider(inference_provider: InferenceProvider, method: str, **kwargs):
+    """
+    Call a provider method and record how long it took, so `auto` mode and the status line have data. Calls go
+    through the rate governor when limits are configured; returns None if the call was shed. The call runs on a
+    worker thread, so Ctrl-C cancels it right away (see `wait_for_call`).
+    """
+    provider_name, model, profile = inference_provider.NAME, inference_provider.model, inference_provider.profile
+
+    governor = get_rate_governor(provider_name)
+    samples = kwargs.get("samples", 1)
+    estimated_tokens = ESTIMATED_TOKENS_PER_CALL * samples
+    if governor:
+        try:
+            governor.acquire(tokens=estimated_tokens, requests=samples, interactive=is_interactive())
+        except RateLimitExceeded as e:
+            print(e)
+            return None
+
+    call = InFlightCall(lambda: getattr(inference_provider, method)(**kwargs))
+    try:
+        wait_for_call(inference_provider, call)
+    except (KeyboardInterrupt, SwitchBackend):
+        # Cancelled calls aren't recorded; how long they would have taken is unknown
+        inference_provider.cancel()
+        raise
+
+    latency = call.elapsed
+    try:
+        response = call.result()
+    except Exception:
+        latency_stats.record(provider_name, model, latency, ok=False, profile=profile)
+        raise
+    latency_stats.record(provider_name, model, latency, ok=bool(response), profile=profile)
+    query_timings.append(("model call", latency))
+    if governor and inference_provider.last_usage:
+        usage = inference_provider.last_usage
+        governor.settle(estimated_tokens, usage.input_tokens + usage.output_tokens)
+    return response
+
+
+def wait_for_call(inference_provider: InferenceProvider, call: InFlightCall) -> None:
+    """
+    Show how long the call has been running until it finishes. Ctrl-C cancels it, or once it has run past the
+    backend's usual p95, offers to switch to another configured backend instead (raising SwitchBackend).
+    """
+    usual = latency_stats.summary(inference_provider.NAME, inference_provider.model, inference_provider.profile)
+    if not usual or not usual.samples or usual.error_rate == 1:
+        usual = None
+    slow_after = usual.p95 if usual else SLOW_CALL_DEFAULT_SECONDS
+    fallback = None
+    looked_for_fallback = False
+
+    with console.status(get_status_message(inference_provider, usual, 0), spinner="dots") as status:
+        while True:
+            try:
+                while not call.wait(STATUS_REFRESH_SECONDS):
+                    if call.elapsed > slow_after and not looked_for_fallback:
+                        fallback = get_fallback_backend(inference_provider)
+                        looked_for_fallback = True
+                    status.update(get_status_message(inference_provider, usual, call.elapsed, fallback))
+                return
+            except KeyboardInterrupt:
+                if fallback is None:
+                    raise
+                status.stop()
+                action = ask_slow_call_action(*fallback)
+                if action == SWITCH_BACKEND:
+                    raise SwitchBackend(get_inference_provider(inference_provider.profile, llm_provider=fallback[0]))
+                if action != KEEP_WAITING:
+                    raise
+                status.start()
+
+
+def ask_slow_call_action(provider_name: str, model: str) -> str | None:
+    return questionary.select(
+        "This is taking longer than usual:",
+        choices=[
+            questionary.Choice(f"Switch to {model} via {provider_name}", value=SWITCH_BACKEND),
+            questionary.Choice("Keep waiting", value=KEEP_WAITING),
+            questionary.Choice("Cancel"),
+        ],
+    ).ask()
+
+
+def get_status_message(
+    inference_provider: InferenceProvider,
+    usual: LatencySummary | None,
+    elapsed: float,
+    fallback: tuple[str, str] | None = None,
+) -> str:
+    message = (
+        f"[bold blue]Thinking... {elapsed:.1f}s [grey39](running query using {inference_provider.model} via "
+        f"{inference_provider.NAME} backend, {inference_provider.profile} profile"
+    )
+    if usual:
+        message += f", usually {usual.p50:.1f}s, p95 {usual.p95:.1f}s"
+        if usual.error_rate:
+            message += f", {usual.error_rate:.0%} errors"
+    message += ")[/grey39][/bold blue]"
+    if fallback:
+        provider_name, model = fallback
+        message += (
+            f"\n[yellow]Taking longer than usual. Press Ctrl-C to cancel or switch to {model} via {provider_name}."
+        )
+    return message
+
+
+def print_timings(inference_provider: InferenceProvider):
+    rprint("\n[bold]Timings:[/bold]")
+    for label, seconds in query_timings:
+        rprint(f"  {label:<16}{seconds:.2f}s")
+
+    rprint(f"\n[bold]Recent latency for {inference_provider.model} via {inference_provider.NAME}:[/bold]")
+    for profile in PROFILES:
+        summary = latency_stats.summary(inference_provider.NAME, inference_provider.model, profile)
+        if not summary or summary.error_rate == 1:
+            rprint(f"  {profile:<16}[grey39]no successful calls yet[/grey39]")
+            continue
+        rprint(
+            f"  {profile:<16}p50 {summary.p50:.1f}s  p90 {summary.p90:.1f}s  "
+            f"[grey39]({summary.samples} calls, {summary.error_rate:.0%} errors)[/grey39]"
+        )
+
+
+def get_options(words: str, profile: str | None = None, show_timings: bool = False):
     context = get_env_context()
-    console = Console()
     rprint(f"")
-    inference_provider = get_inference_provider()
-    with console.status(
-        f"[bold blue]Thinking... [grey39](running query using {inference_provider.model} via {config.llm_provider} backend)",
-        spinner="dots",
-    ):
-        response = inference_provider.get_options(prompt=words, context=context)
-        command_history.save_options(words, response)
-
-    if response is None:
+    start = time.monotonic()
+    inference_provider = get_inference_provider(profile)
+    response_cache = get_response_cache()
+    query_timings.append(("provider setup", time.monotonic() - start))
+    try:
+        run_conversation(inference_provider, response_cache, words, context)
+    finally:
+        if response_cache:
+            response_cache.flush()
+    if show_timings:
+        print_timings(inference_provider)
+
+
+def run_conversation(
+    inference_provider: InferenceProvider,
+    response_cache: ResponseCache | None,
+    words: str,
+    context: str,
+    turns: list[ConversationTurn] | None = None,
+    refinement: str | None = None,
+) -> list[ConversationTurn]:
+    """
+    Ask for options and let the user pick one, refine them or ask for more. Pass the turns of an earlier
+    conversation and a refinement to continue it. Returns the turns of the conversation.
+    """
+    turns = list(turns or [])
+
+    # The offline index answers in well under the time the model takes, so show its matches while we wait
+    local_hits = search_offline(words) if refinement is None else []
+    if local_hits:
+        rprint("[grey39]Offline matches (still asking the model):[/grey39]")
+        for hit in local_hits:
+            rprint(f"  [grey39]{escape(hit.command)}[/grey39]")
+        rprint("")
+
+    # Each pass shows one set of options; picking "Refine..." loops back with the follow-up text
+    while True:
+        try:
+            if refinement is None:
+                response, response_id = fetch_options(inference_provider, response_cache, words, context)
+            else:
+                response = call_provider(
+                    inference_provider, "refine_options", follow_up=refinement, context=context, turns=turns
+                )
+                response_id = inference_provider.last_response_id
+        except SwitchBackend as switch:
+            # Ask the other backend the same thing, and keep using it for the rest of the conversation
+            inference_provider = switch.inference_provider
+            continue
+
+        if response is None:
+            if local_hits and not turns:
+                show_options(
+                    local_hits,
+                    on_select=lambda cmd: command_history.record_selection(words, cmd),
+                    on_run=lambda cmd, run: command_history.record_run(words, cmd, run),
+                )
+            return turns
+
+        turns.append(
+            ConversationTurn(
+                query=words if refinement is None else refinement,
+                response=response,
+                response_id=response_id,
+            )
+        )
+        refinements = [turn.query for turn in turns[1:]]
+        command_history.save_options(words, response, refinements=refinements)
+
+        if not response.is_valid:
+            print(response.explanation_if_not_valid)
+            return turns
+
+        if not response.commands:
+            print("No commands available")
+            return turns
+
+        commands = response.commands
+        if not turns[1:]:
+            commands = merge_commands(commands, local_hits)
+
+        # "More options..." samples the original query again, so it's only offered before any refinement
+        allow_more = not turns[1:]
+        shown = list(commands)
+        while True:
+            follow_up = show_options(
+                commands,
+                allow_refine=True,
+                allow_more=allow_more,
+                on_select=lambda cmd: command_history.record_selection(words, cmd, refinements=refinements),
+                on_run=lambda cmd, run: command_history.record_run(words, cmd, run, refinements=refinements),
+            )
+            if not follow_up:
+                return turns
+            if not follow_up.more_options:
+                break
+            rprint("")
+            more = get_more_options(inference_provider, words, context, shown=shown)
+            if more:
+                commands = more
+                shown += more
+            else:
+                print("No new options found")
+                allow_more = False
+
+        refinement = follow_up.refinement
+        rprint("")
+
+
+def get_more_options(
+    inference_provider: InferenceProvider, words: str, context: str, shown: list[Command]
+) -> list[Command]:
+    """Sample several answers in one go and return the commands not already shown, best first."""
+    try:
+        responses = call_provider(
+            inference_provider, "get_more_options", prompt=words, context=context, samples=MORE_OPTIONS_SAMPLES
+        )
+    except SwitchBackend as switch:
+        return get_more_options(switch.inference_provider, words, context, shown)
+    commands = rank_commands(
+        responses or [],
+        command_history.get_tool_counts(),
+        exclude={normalize_command(cmd.command) for cmd in shown},
+    )
+    if commands:
+        # Save everything shown so far, so the history entry for this query has all of it
+        command_history.save_options(words, OptionsResponse(commands=shown + commands, is_valid=True), new_use=False)
+    return commands
+
+
+def merge_commands(commands: list[Command], extra: list[Command]) -> list[Command]:
+    seen = {cmd.command for cmd in commands}
+    return commands + [cmd for cmd in extra if cmd.command not in seen]
+
+
+def get_offline_options(words: str):
+    rprint("")
+    commands = search_offline(words)
+    if not commands:
+        print("No offline matches found. Run without --offline to ask your LLM provider.")
         return
 
-    if not response.is_valid:
-        print(response.explanation_if_not_valid)
+    command_history.save_options(words, OptionsResponse(commands=commands, is_valid=True))
+    show_options(
+        commands,
+        on_select=lambda cmd: command_history.record_selection(words, cmd),
+        on_run=lambda cmd, run: command_history.record_run(words, cmd, run),
+    )
+
+
+def run_explain(command: str, offline: bool = False, profile: str | None = None):
+    """
+    Explain a command from the local man page index, and ask the model only about the parts the index can't
+    explain (unless offline).
+    """
+    rprint("")
+    explanation = explain(command)
+    print_explanation(explanation)
+
+    answer = None
+    if explanation.unresolved and not offline:
+        rprint("")
+        answer = get_model_explanation(command, explanation.unresolved, profile)
+        if answer:
+            rprint(f"[bold]In short:[/bold] {escape(answer.short_explanation)}")
+
+    danger = explanation.command.dangerous_explanation
+    if not danger and answer and answer.is_dangerous:
+        danger = answer.dangerous_explanation
+    if danger:
+        rprint(f"\n[red]⚠️ Warning: {escape(danger)}[/red]")
+
+
+def get_model_explanation(command: str, unresolved: list[str], profile: str | None = None) -> Command | None:
+    inference_provider = get_inference_provider(profile)
+    prompt = EXPLAIN_QUERY.format(command=command, unresolved=", ".join(f"`{token}`" for token in unresolved))
+    while True:
+        try:
+            response = call_provider(inference_provider, "get_options", prompt=prompt, context=get_env_context())
+            break
+        except SwitchBackend as switch:
+            inference_provider = switch.inference_provider
+    if not response or not response.is_valid or not response.commands:
+        return None
+    return response.commands[0]
+
+
+def run_no_prompt(offline: bool = False, profile: str | None = None, show_timings: bool = False):
+    input = get_input_string("input", "Describe what you want to do:", required=False, help_text="(-h for help)")
+    if handle_special_case(input):
         return
-
-    if not response.commands:
-        print("No commands available")
+    query = check_query(input)
+    if query is None:
+        return
+    if offline:
+        get_offline_options(query)
         return
+    get_options(query, profile=profile, show_timings=show_timings)
 
-    show_options(response.commands)
 
+def check_query(text: str) -> str | None:
+    """The query tidied up for the model, or None after telling the user why it won't be sent."""
+    try:
+        return prepare_query(text)
+    except InvalidQuery as e:
+        rprint(f"[yellow]{e}[/yellow]")
+        return None
 
-def run_no_prompt():
-    input = get_input_string("input", "Describe what you want to do:", required=False, help_text="(-h for help)")
-    if handle_special_case(input):
-        return
-    get_options(input)
+
+def run_session(offline: bool = False, profile: str | None = None, show_timings: bool = False):
+    """
+    Answer queries until the user enters an empty line. The provider (and its connection pool), response cache and
+    environment context are set up once and reused, so each query after the first only waits on the model.
+    """
+    context = get_env_context()
+    inference_provider = None if offline else get_inference_provider(profile)
+    response_cache = None if offline else get_response_cache()
+    turns: list[ConversationTurn] = []
+    rprint("[grey39]Start a query with + to follow up on the previous one. Enter an empty line to exit.[/grey39]\n")
+
+    try:
+        while True:
+            try:
+                words = get_input_string("input", "Describe what you want to do:", required=False).strip()
+            except KeyboardInterrupt:
+                break
+            if not words:
+                break
+            if handle_special_case(words):
+                if words.lower() in ("--setup", "-s") and not offline:
+                    # Setup may have switched provider or model
+                    config.reload()
+                    inference_provider = get_inference_provider(profile)
+                    response_cache = get_response_cache()
+                continue
+            query = check_query(words.lstrip("+ "))
+            if query is None:
+                continue
+
+            query_timings.clear()
+            rprint("")
+            try:
+                if offline:
+                    get_offline_options(query)
+                elif words.startswith("+") and turns:
+                    turns = run_conversation(
+                        inference_provider, response_cache, turns[0].query, context, turns=turns, refinement=query
+                    )
+                else:
+                    turns = run_conversation(inference_provider, response_cache, query, context)
+            except KeyboardInterrupt:
+                rprint("[grey39]Cancelled[/grey39]")
+            if show_timings and inference_provider:
+                print_timings(inference_provider)
+            rprint("")
+    finally:
+        if response_cache:
+            response_cache.flush()
+
+
+def pop_flag(args: list[str], flag: str) -> bool:
+    """Remove a boolean flag from args, returning whether it was there."""
+    found = flag in args
+    args[:] = [arg for arg in args if arg != flag]
+    return found
+
+
+def pop_option(args: list[str], option: str) -> str | None:
+    """Remove `option <value>` from args, returning the value."""
+    if option not in args:
+        return None
+    index = args.index(option)
+    if index + 1 >= len(args):
+        raise ValueError(f"{option} needs a value")
+    value = args[index + 1]
+    del args[index : index + 2]
+    return value
 
 
 def handle_special_case(args):
@@ -71,6 +506,7 @@ def handle_special_case(args):
 
     if command == "--version" or command == "-v":
         from importlib.metadata import version
+
         print(f"zev version: {version('zev')}")
         return True
 
@@ -86,16 +522,37 @@ def handle_special_case(args):
 
 
 def app():
-    migrate_legacy_files()
-    check_for_updates_in_background()
-
-    update_msg = get_update_message()
-    if update_msg:
-        rprint(update_msg)
-
+    try:
+        run_app()
+    except KeyboardInterrupt:
+        rprint("[grey39]Cancelled[/grey39]")
+        sys.exit(130)
+    finally:
+        # Anything that can wait happens after the answer, so it never slows a query down
+        update_msg = get_update_message()
+        if update_msg:
+            rprint(update_msg)
+        maintenance.start_in_background()
+
+
+def run_app():
     config_path = get_config_path()
     args = [arg.strip() for arg in sys.argv[1:]]
+    offline = pop_flag(args, "--offline")
+    show_timings = pop_flag(args, "--timings")
+    try:
+        profile = pop_option(args, "--profile")
+        config_profile = pop_option(args, "--config-profile")
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    session = pop_flag(args, "--session")
+    explain_command = pop_flag(args, "--explain")
 
+    if not config_path.exists():
+        # Legacy files can only be left over if there's no config in the app dir yet
+        migrate_legacy_files()
+        config.reload()
     if not config_path.exists():
         run_setup()
         config.reload()
@@ -103,19 +560,42 @@ def app():
         if len(args) == 1 and args[0] == "--setup":
             return
 
-    if handle_special_case(args):
+    if not explain_command and handle_special_case(args):
         return
 
-    dotenv.load_dotenv(config_path, override=True)
     config.reload()
+    try:
+        if config_profile:
+            config.use_profile(config_profile)
+        # Checked up front, so a typo is reported before any provider is set up
+        validate_profile(profile or config.profile or DEFAULT_PROFILE)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    config.export_to_environ()
+
+    if explain_command:
+        if not args:
+            print('Usage: zev --explain "<command>"')
+            return
+        run_explain(" ".join(args), offline=offline, profile=profile)
+        return
+
+    if session:
+        run_session(offline=offline, profile=profile, show_timings=show_timings)
+        return
 
     if not args:
-        run_no_prompt()
+        run_no_prompt(offline=offline, profile=profile, show_timings=show_timings)
         return
 
-    # Strip any trailing question marks from the input
-    query = " ".join(args).rstrip("?")
-    get_options(query)
+    query = check_query(" ".join(args))
+    if query is None:
+        return
+    if offline:
+        get_offline_options(query)
+        return
+    get_options(query, profile=profile, show_timings=show_timings)
 
 
 if __name__ == "__main__":
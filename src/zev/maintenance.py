@@ -0,0 +1,205 @@
+"""
+Housekeeping that doesn't need to happen while the user waits: update checks, history compaction, cache eviction,
+token refresh and index rebuilds. Due jobs run in a detached `python -m zev.maintenance` process started after the
+answer is shown.
+
+The ledger records when each job last ran. Its mtime is set to when the next job is due, so checking whether
+anything needs to run costs the foreground a single stat.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from zev.file_utils import atomic_write_lines, file_lock
+from zev.paths import get_maintenance_ledger_path
+
+HOUR = 3600
+# While a run is in progress, other processes treat nothing as due for this long
+RUNNING_GRACE_PERIOD = 5 * 60
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    interval: float  # seconds between runs, unless overridden with MAINTENANCE_INTERVALS
+    run: Callable[[], None]
+
+
+# Each job imports what it needs, so importing this module stays cheap for the foreground process
+
+
+def _check_for_updates():
+    from zev.update_check import refresh_update_cache  # pylint: disable=import-outside-toplevel
+
+    refresh_update_cache()
+
+
+def _compact_history():
+    from zev.command_history import CommandHistory  # pylint: disable=import-outside-toplevel
+
+    CommandHistory().compact()
+
+
+def _evict_cache():
+    # pylint: disable=import-outside-toplevel
+    from zev.config import config
+    from zev.constants import CacheBackends
+
+    # Shared backends expire entries themselves
+    if config.cache_backend == CacheBackends.FILE:
+        from zev.cache.file_backend import FileCacheBackend
+
+        FileCacheBackend().evict_expired()
+
+
+def _refresh_tokens():
+    # pylint: disable=import-outside-toplevel
+    from zev.config import config
+    from zev.constants import LLMProviders
+
+    uses_azure = config.llm_provider in (LLMProviders.AZURE_OPENAI, LLMProviders.AUTO)
+    if not uses_azure or not config.azure_openai_account_name or config.azure_openai_api_key:
+        return
+
+    from zev.llms.azure_openai.token_cache import REFRESH_MARGIN, CachedAzureTokenProvider
+
+    interval = get_intervals()["token_refresh"]
+    CachedAzureTokenProvider(credential_sources=config.azure_credential_sources).refresh_if_expiring(
+        interval + REFRESH_MARGIN
+    )
+
+
+def _rebuild_indexes():
+    # pylint: disable=import-outside-toplevel
+    from zev.command_history import CommandHistory
+    from zev.config import config
+    from zev.llms.plugins import get_plugins
+
+    # Each of these rebuilds its index only if it's missing or stale
+    config.reload()
+    get_plugins()
+    CommandHistory().get_ranked_stats()
+
+
+JOBS = (
+    MaintenanceJob("update_check", 24 * HOUR, _check_for_updates),
+    MaintenanceJob("history_compaction", 24 * HOUR, _compact_history),
+    MaintenanceJob("cache_eviction", 24 * HOUR, _evict_cache),
+    MaintenanceJob("token_refresh", HOUR / 2, _refresh_tokens),
+    MaintenanceJob("index_rebuild", 24 * HOUR, _rebuild_indexes),
+)
+
+
+def get_intervals() -> dict[str, Optional[float]]:
+    """
+    Interval in seconds for each job. MAINTENANCE_INTERVALS overrides them in hours, e.g.
+    `update_check=168,cache_eviction=6`, and 0 turns a job off (None).
+    """
+    from zev.config import config  # pylint: disable=import-outside-toplevel
+
+    intervals: dict[str, Optional[float]] = {job.name: job.interval for job in JOBS}
+    for item in (config.maintenance_intervals or "").split(","):
+        name, _, hours = item.partition("=")
+        name = name.strip()
+        if name not in intervals:
+            continue
+        try:
+            intervals[name] = float(hours) * HOUR or None
+        except ValueError:
+            continue
+    return intervals
+
+
+def is_due() -> bool:
+    try:
+        return os.stat(get_maintenance_ledger_path()).st_mtime <= time.time()
+    except FileNotFoundError:
+        return True
+
+
+def start_in_background() -> None:
+    """Start a detached process to run due jobs, if any are due. It outlives this process."""
+    if not is_due():
+        return
+
+    from zev.config import CONFIG_PROFILE_ENV_VAR, config  # pylint: disable=import-outside-toplevel
+
+    env = {**os.environ, CONFIG_PROFILE_ENV_VAR: config.profile_name}
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "zev.maintenance"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            env=env,
+            **kwargs,
+        )
+    except OSError:
+        pass  # maintenance is best-effort; the next run will try again
+
+
+def run_due_jobs(force: bool = False) -> dict:
+    """Run every job that's due (or every enabled job with `force`), record it in the ledger and return the ledger."""
+    path = get_maintenance_ledger_path()
+    with file_lock(path):
+        ledger = _read_ledger()
+        _set_next_due(time.time() + RUNNING_GRACE_PERIOD)
+
+        intervals = get_intervals()
+        for job in JOBS:
+            interval = intervals[job.name]
+            last_run = ledger.get(job.name, {}).get("last_run", 0)
+            if interval is None or (not force and time.time() - last_run < interval):
+                continue
+
+            start = time.time()
+            try:
+                job.run()
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            ledger[job.name] = {
+                "last_run": start,
+                "duration": round(time.time() - start, 3),
+                "ok": error is None,
+                "error": error,
+            }
+
+        atomic_write_lines(path, [json.dumps(ledger, indent=2)])
+        due_times = [
+            ledger.get(job.name, {}).get("last_run", 0) + intervals[job.name]
+            for job in JOBS
+            if intervals[job.name] is not None
+        ]
+        _set_next_due(min(due_times, default=time.time() + 24 * HOUR))
+    return ledger
+
+
+def _read_ledger() -> dict:
+    try:
+        with open(get_maintenance_ledger_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _set_next_due(timestamp: float) -> None:
+    path = get_maintenance_ledger_path()
+    if not path.exists():
+        atomic_write_lines(path, ["{}"])
+    os.utime(path, (timestamp, timestamp))
+
+
+if __name__ == "__main__":
+    run_due_jobs(force="--force" in sys.argv)
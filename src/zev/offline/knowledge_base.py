@@ -0,0 +1,175 @@
+"""
+A small offline index of common command recipes, so frequent questions can be answered without an LLM call.
+
+The index is compiled from recipes.json by scripts/build_offline_index.py and memory-mapped at lookup time.
+Layout (little-endian):
+
+    header        magic, n_terms, n_records, postings_offset, record_table_offset, blob_offset
+    term table    n_terms x (term hash u64, first posting u32, posting count u32, idf f32), sorted by hash
+    postings      u32 record ids
+    record table  (n_records + 1) x u32 offsets into the blob
+    blob          one JSON object per record
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import re
+import struct
+from pathlib import Path
+from typing import Optional
+
+from zev.llms.types import Command
+
+INDEX_PATH = Path(__file__).parent / "recipes.idx"
+RECIPES_PATH = Path(__file__).parent / "recipes.json"
+
+MAGIC = b"ZEVKB\x00\x00\x01"
+HEADER = struct.Struct("<8sIIIII")
+TERM = struct.Struct("<QIIf")
+U32 = struct.Struct("<I")
+
+# Fraction of the query's weight (sum of idf) that a recipe has to match to count as a hit
+MIN_SCORE = 0.6
+
+STOPWORDS = frozenset(
+    "a all an and any are as at be by can do for from get how i in into is it its me my of on or please "
+    "that the their them there these this to using want way what when where which with would you your".split()
+)
+
+_index = None
+
+
+def _stem(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if re.search(r"(s|x|ch|sh)es$", word):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    if word.endswith("ing") and len(word) > 5:
+        return word[:-3]
+    if word.endswith("ed") and len(word) > 4:
+        return word[:-2]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [_stem(word) for word in words if word not in STOPWORDS]
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class KnowledgeBaseIndex:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_terms, self.n_records, self.postings_offset, self.record_table_offset, self.blob_offset = (
+            HEADER.unpack_from(self.buffer, 0)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a zev offline index")
+
+    def lookup(self, term: str) -> Optional[tuple[float, list[int]]]:
+        """Binary search the term table. Returns (idf, record ids) or None if the term isn't indexed."""
+        target = term_hash(term)
+        low, high = 0, self.n_terms - 1
+        while low <= high:
+            middle = (low + high) // 2
+            hashed, first, count, idf = TERM.unpack_from(self.buffer, HEADER.size + middle * TERM.size)
+            if hashed < target:
+                low = middle + 1
+            elif hashed > target:
+                high = middle - 1
+            else:
+                start = self.postings_offset + first * U32.size
+                return idf, list(struct.unpack_from(f"<{count}I", self.buffer, start))
+        return None
+
+    def record(self, record_id: int) -> dict:
+        start, end = struct.unpack_from("<II", self.buffer, self.record_table_offset + record_id * U32.size)
+        return json.loads(self.buffer[self.blob_offset + start : self.blob_offset + end])
+
+
+def _get_index() -> Optional[KnowledgeBaseIndex]:
+    global _index
+    if _index is None and INDEX_PATH.exists():
+        _index = KnowledgeBaseIndex(INDEX_PATH)
+    return _index
+
+
+def search(query: str, limit: int = 3) -> list[Command]:
+    index = _get_index()
+    terms = set(tokenize(query))
+    if index is None or not terms:
+        return []
+
+    # Terms the index has never seen count as much as its rarest term, so off-topic queries don't match
+    max_idf = math.log(1 + index.n_records)
+    total = 0.0
+    scores: dict[int, float] = {}
+    for term in terms:
+        entry = index.lookup(term)
+        if entry is None:
+            total += max_idf
+            continue
+        idf, record_ids = entry
+        total += idf
+        for record_id in record_ids:
+            scores[record_id] = scores.get(record_id, 0.0) + idf
+
+    # Ties go to the recipe listed first, recipes.json is roughly ordered from most to least common
+    ranked = sorted((-score, record_id) for record_id, score in scores.items() if score / total >= MIN_SCORE)
+    return [_to_command(index.record(record_id)) for _, record_id in ranked[:limit]]
+
+
+def _to_command(record: dict) -> Command:
+    return Command(
+        command=record["command"],
+        short_explanation=record["short_explanation"],
+        is_dangerous=record.get("is_dangerous", False),
+        dangerous_explanation=record.get("dangerous_explanation"),
+    )
+
+
+def build_index(recipes_path: Path = RECIPES_PATH, index_path: Path = INDEX_PATH) -> None:
+    with open(recipes_path, "r", encoding="utf-8") as f:
+        recipes = json.load(f)
+
+    postings: dict[str, list[int]] = {}
+    for record_id, recipe in enumerate(recipes):
+        text = " ".join([recipe["description"], recipe.get("keywords", ""), recipe["command"]])
+        for term in sorted(set(tokenize(text))):
+            postings.setdefault(term, []).append(record_id)
+
+    terms = sorted(postings, key=term_hash)
+    if len({term_hash(term) for term in terms}) != len(terms):
+        raise ValueError("Term hash collision, the index format needs a wider hash")
+
+    term_table = b""
+    posting_ids: list[int] = []
+    for term in terms:
+        idf = math.log(1 + len(recipes) / len(postings[term]))
+        term_table += TERM.pack(term_hash(term), len(posting_ids), len(postings[term]), idf)
+        posting_ids.extend(postings[term])
+    postings_blob = struct.pack(f"<{len(posting_ids)}I", *posting_ids)
+
+    records = [
+        json.dumps({key: value for key, value in recipe.items() if key not in ("description", "keywords")}).encode()
+        for recipe in recipes
+    ]
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    record_table = struct.pack(f"<{len(offsets)}I", *offsets)
+
+    postings_offset = HEADER.size + len(term_table)
+    record_table_offset = postings_offset + len(postings_blob)
+    blob_offset = record_table_offset + len(record_table)
+    header = HEADER.pack(MAGIC, len(terms), len(recipes), postings_offset, record_table_offset, blob_offset)
+
+    index_path.write_bytes(header + term_table + postings_blob + record_table + b"".join(records))
@@ -17,6 +17,54 @@ def get_history_path() -> Path:
     return get_app_dir() / "history"
 
 
+def get_azure_token_cache_path() -> Path:
+    return get_app_dir() / "azure_token_cache.json"
+
+
+def get_probe_results_path() -> Path:
+    return get_app_dir() / "probe_results.jsonl"
+
+
+def get_latency_stats_path() -> Path:
+    return get_app_dir() / "latency_stats.json"
+
+
+def get_response_cache_dir() -> Path:
+    path = get_app_dir() / "response_cache"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def get_help_index_dir() -> Path:
+    path = get_app_dir() / "help_index"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def get_config_snapshot_path() -> Path:
+    return get_app_dir() / "config_snapshot.json"
+
+
+def get_plugin_index_path() -> Path:
+    return get_app_dir() / "plugin_index.json"
+
+
+def get_history_index_path() -> Path:
+    return get_app_dir() / "history_index.json"
+
+
+def get_history_quarantine_path() -> Path:
+    return get_app_dir() / "history.corrupt"
+
+
+def get_rate_limit_state_path() -> Path:
+    return get_app_dir() / "rate_limits.json"
+
+
+def get_maintenance_ledger_path() -> Path:
+    return get_app_dir() / "maintenance.json"
+
+
 def migrate_legacy_files() -> None:
     """Move legacy ~/. files to the app data dir if they exist."""
     home = Path.home()
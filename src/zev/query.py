@@ -0,0 +1,98 @@
+"""
+Checks and normalization applied to a query before anything is sent to a provider. Queries with the same
+`canonical_key` are treated as the same question by the response cache and history.
+"""
+
+import unicodedata
+
+# Only applied to the key; the model sees the user's own words
+ABBREVIATIONS = {
+    "b/w": "between",
+    "cfg": "config",
+    "conf": "config",
+    "cwd": "current directory",
+    "dir": "directory",
+    "dirs": "directories",
+    "img": "image",
+    "imgs": "images",
+    "msg": "message",
+    "msgs": "messages",
+    "num": "number",
+    "pkg": "package",
+    "pkgs": "packages",
+    "pls": "please",
+    "plz": "please",
+    "proc": "process",
+    "procs": "processes",
+    "repo": "repository",
+    "repos": "repositories",
+    "u": "you",
+    "ur": "your",
+    "var": "variable",
+    "vars": "variables",
+    "w/": "with",
+    "w/o": "without",
+}
+# Ways of asking that don't change what's being asked for
+FILLER_PREFIXES = (
+    "how do i",
+    "how can i",
+    "how would i",
+    "how to",
+    "i want to",
+    "i need to",
+    "i'd like to",
+    "can you",
+    "could you",
+    "show me how to",
+    "help me",
+    "please",
+)
+FILLER_SUFFIXES = ("please", "for me")
+EXAMPLE_QUERY = "find files larger than 100MB in this directory"
+
+_QUOTES = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"'})
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def prepare_query(query: str) -> str:
+    """
+    Tidy up a query for the model, or raise InvalidQuery if there's nothing worth sending, so the user hears about
+    it straight away instead of after a round trip.
+    """
+    # Only a trailing ? goes; a trailing . or ! can be part of the request, as in "files starting with ."
+    text = query.strip().rstrip("?").rstrip()
+    if not text:
+        raise InvalidQuery(f"Describe what you want to do, for example: {EXAMPLE_QUERY}")
+    if not any(char.isalpha() for char in text):
+        raise InvalidQuery(f"That doesn't describe anything to do. Try something like: {EXAMPLE_QUERY}")
+    if len(canonical_key(text)) < 2:
+        raise InvalidQuery(f"Say what you want to do, for example: {EXAMPLE_QUERY}")
+    return text
+
+
+def canonical_key(query: str) -> str:
+    """
+    A stable key for a query: whitespace, curly quotes, a trailing `?`, common abbreviations and filler like "how do I"
+    don't change it. Case and all other punctuation are kept, since they can change the command (`grep TODO`, `split
+    on ,` vs `split on ;`); abbreviations and filler are only recognised as whole words, in any case.
+    """
+    text = unicodedata.normalize("NFKC", query).translate(_QUOTES)
+    words = [ABBREVIATIONS.get(word.lower(), word) for word in text.split()]
+    text = " ".join(words).rstrip("?").rstrip()
+
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in FILLER_PREFIXES:
+            if text.lower() == prefix or text.lower().startswith(prefix + " "):
+                text = text[len(prefix) :].lstrip()
+                stripped = True
+        for suffix in FILLER_SUFFIXES:
+            if text.lower() == suffix or text.lower().endswith(" " + suffix):
+                text = text[: -len(suffix)].rstrip().rstrip("?").rstrip()
+                stripped = True
+    return text
@@ -0,0 +1,41 @@
+from collections import Counter
+
+from zev.llms.types import Command, OptionsResponse
+
+# How much a command's score goes up if its tool already shows up in the user's history.
+# Agreement between samples counts 1 per sample, so this only breaks ties and near-ties.
+HISTORY_TOOL_BONUS = 0.5
+
+
+def normalize_command(command: str) -> str:
+    return " ".join(command.split())
+
+
+def get_tool(command: str) -> str:
+    parts = command.split()
+    return parts[0] if parts else ""
+
+
+def rank_commands(
+    responses: list[OptionsResponse], history_tools: Counter, exclude: set[str] = frozenset()
+) -> list[Command]:
+    """
+    Merge the commands from several samples, dropping duplicates (by whitespace-normalized text) and anything in
+    `exclude`. Commands suggested by more samples rank higher, with a bonus for tools the user has used before.
+    """
+    agreement: Counter = Counter()
+    first_seen: dict[str, Command] = {}
+    for response in responses:
+        if not response.is_valid:
+            continue
+        for normalized in {normalize_command(cmd.command) for cmd in response.commands}:
+            agreement[normalized] += 1
+        for cmd in response.commands:
+            first_seen.setdefault(normalize_command(cmd.command), cmd)
+
+    def score(normalized: str) -> float:
+        return agreement[normalized] + (HISTORY_TOOL_BONUS if history_tools[get_tool(normalized)] else 0)
+
+    candidates = [normalized for normalized in first_seen if normalized not in exclude]
+    candidates.sort(key=score, reverse=True)  # stable, so ties keep the order the model gave
+    return [first_seen[normalized] for normalized in candidates]
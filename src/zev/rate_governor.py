@@ -0,0 +1,181 @@
+import json
+import sys
+import time
+from datetime import date
+from typing import Optional
+
+from rich import print as rprint
+
+from zev.config import config
+from zev.constants import RATE_LIMIT_DEFAULT_MAX_WAIT_SECONDS
+from zev.file_utils import atomic_write_lines, file_lock
+from zev.paths import get_rate_limit_state_path
+
+# Charged up front for each call, then corrected once the provider reports real usage
+ESTIMATED_TOKENS_PER_CALL = 1500
+# Batch and headless calls leave this share of each bucket for interactive users
+BATCH_RESERVE = 0.25
+# Waiting processes re-check this often, since other processes may take or return capacity meanwhile
+POLL_INTERVAL = 1.0
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+def is_interactive() -> bool:
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+
+def _limit_setting(value: Optional[int]) -> Optional[int]:
+    """Limits that are unset or zero mean no limit."""
+    return value if value and value > 0 else None
+
+
+class RateGovernor:
+    """
+    Token buckets for requests and tokens per minute, plus a daily token budget, for one provider. The state lives
+    in the app dir, so every zev process on the machine draws from the same buckets.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        daily_token_budget: Optional[int] = None,
+        max_wait: float = RATE_LIMIT_DEFAULT_MAX_WAIT_SECONDS,
+    ):
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.daily_token_budget = daily_token_budget
+        self.max_wait = max_wait
+        self.path = get_rate_limit_state_path()
+
+    def acquire(self, tokens: int = ESTIMATED_TOKENS_PER_CALL, requests: int = 1, interactive: bool = True) -> None:
+        """
+        Take capacity for a call, waiting up to `max_wait` for the buckets to refill. Raises RateLimitExceeded
+        if the call would have to wait longer or the daily budget is used up.
+        """
+        deadline = time.monotonic() + self.max_wait
+        announced = False
+        while True:
+            wait = self._try_take(tokens, requests, interactive)
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(
+                    f"Rate limit for {self.provider} reached and the next slot is {wait:.0f}s away. "
+                    "Try again in a moment, or raise RATE_LIMIT_MAX_WAIT_SECONDS in your config."
+                )
+            if not announced:
+                priority = "" if interactive else " (batch calls yield to interactive ones)"
+                rprint(f"[grey39]Rate limit for {self.provider} reached, waiting about {wait:.0f}s{priority}[/grey39]")
+                announced = True
+            time.sleep(min(wait, POLL_INTERVAL))
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token buckets once the real usage of a call is known."""
+        difference = estimated_tokens - actual_tokens
+        if not difference:
+            return
+        try:
+            with file_lock(self.path):
+                data = self._read()
+                state = self._refill(data.get(self.provider), time.time())
+                if self.tokens_per_minute:
+                    state["tokens"] = min(self.tokens_per_minute, state["tokens"] + difference)
+                state["day_tokens"] = max(0, state["day_tokens"] - difference)
+                data[self.provider] = state
+                atomic_write_lines(self.path, [json.dumps(data)])
+        except OSError:
+            pass
+
+    def _try_take(self, tokens: int, requests: int, interactive: bool) -> float:
+        """Take the capacity and return 0, or return how many seconds until it should be available."""
+        try:
+            with file_lock(self.path):
+                data = self._read()
+                state = self._refill(data.get(self.provider), time.time())
+
+                if self.daily_token_budget and state["day_tokens"] + tokens > self.daily_token_budget:
+                    raise RateLimitExceeded(
+                        f"The daily token budget for {self.provider} ({self.daily_token_budget:,} tokens) is used "
+                        "up. It resets at midnight, or raise DAILY_TOKEN_BUDGET in your config."
+                    )
+
+                reserve = 0 if interactive else BATCH_RESERVE
+                wait = max(
+                    self._wait_for(state["requests"], requests, self.requests_per_minute, reserve),
+                    self._wait_for(state["tokens"], tokens, self.tokens_per_minute, reserve),
+                )
+                if wait > 0:
+                    return wait
+
+                # Buckets without a limit aren't tracked, so there's nothing to owe when one is set later
+                if self.requests_per_minute:
+                    state["requests"] -= requests
+                if self.tokens_per_minute:
+                    state["tokens"] -= tokens
+                state["day_tokens"] += tokens
+                data[self.provider] = state
+                atomic_write_lines(self.path, [json.dumps(data)])
+                return 0
+        except OSError:
+            return 0  # the governor is best-effort and must never break a query on its own
+
+    @staticmethod
+    def _wait_for(available: float, needed: int, per_minute: Optional[int], reserve: float) -> float:
+        if not per_minute:
+            return 0
+        # A single call bigger than the whole bucket is let through once the bucket is full
+        needed = min(needed + reserve * per_minute, per_minute)
+        if available >= needed:
+            return 0
+        return (needed - available) * 60 / per_minute
+
+    def _refill(self, state: Optional[dict], now: float) -> dict:
+        today = date.today().isoformat()
+        if state is None:
+            state = {"requests": None, "tokens": None, "updated": now, "day": today, "day_tokens": 0}
+
+        elapsed = max(0.0, now - state["updated"])
+        for bucket, per_minute in (("requests", self.requests_per_minute), ("tokens", self.tokens_per_minute)):
+            if not per_minute:
+                state[bucket] = None  # no limit, so no bucket
+            elif state.get(bucket) is None:
+                state[bucket] = per_minute  # buckets start full, including when a limit is first set
+            else:
+                # A call bigger than the whole bucket can leave it in debt, but never by more than a minute's worth
+                refilled = state[bucket] + elapsed * per_minute / 60
+                state[bucket] = min(per_minute, max(-per_minute, refilled))
+        state["updated"] = now
+        if state["day"] != today:
+            state["day"] = today
+            state["day_tokens"] = 0
+        return state
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+
+def get_rate_governor(provider: str) -> Optional[RateGovernor]:
+    requests_per_minute = _limit_setting(config.rate_limit_rpm)
+    tokens_per_minute = _limit_setting(config.rate_limit_tpm)
+    daily_token_budget = _limit_setting(config.daily_token_budget)
+    if not (requests_per_minute or tokens_per_minute or daily_token_budget):
+        return None
+
+    max_wait = _limit_setting(config.rate_limit_max_wait_seconds) or RATE_LIMIT_DEFAULT_MAX_WAIT_SECONDS
+    return RateGovernor(
+        provider,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        daily_token_budget=daily_token_budget,
+        max_wait=max_wait,
+    )
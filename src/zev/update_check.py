@@ -1,7 +1,5 @@
 import json
 import sys
-import threading
-import time
 from importlib.metadata import version
 from urllib.error import URLError
 from urllib.request import urlopen
@@ -9,7 +7,6 @@ from urllib.request import urlopen
 from zev.paths import get_app_dir
 
 CACHE_FILE = get_app_dir() / "update_cache"
-CHECK_INTERVAL = 86400  # 24 hours
 PYPI_URL = "https://pypi.org/pypi/zev/json"
 
 
@@ -29,15 +26,6 @@ def _fetch_latest_version() -> str | None:
         return None
 
 
-def _should_check() -> bool:
-    if not CACHE_FILE.exists():
-        return True
-    try:
-        return time.time() - CACHE_FILE.stat().st_mtime > CHECK_INTERVAL
-    except Exception:
-        return True
-
-
 def _write_cache(latest: str | None):
     try:
         CACHE_FILE.write_text(latest or "")
@@ -77,13 +65,6 @@ def get_update_message() -> str | None:
     return None
 
 
-def check_for_updates_in_background():
-    """Kick off a background thread to refresh the PyPI version cache."""
-    if not _should_check():
-        return
-
-    def _check():
-        latest = _fetch_latest_version()
-        _write_cache(latest)
-
-    threading.Thread(target=_check, daemon=True).start()
+def refresh_update_cache():
+    """Fetch the latest version from PyPI into the cache. Run as a maintenance job, so it never blocks a query."""
+    _write_cache(_fetch_latest_version())
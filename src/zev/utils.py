@@ -54,8 +54,14 @@ Zev is a simple CLI tool to help you remember terminal commands.
 
 Usage:
 zev "<query>"               Describe what you want to do
+zev --offline "<query>"     Only look in the bundled offline recipes (no LLM call)
+zev --profile <name> "<query>"  Use the fast, balanced or thorough latency profile
+zev --config-profile <name> "<query>"  Use a named profile from your config file
+zev --session               Keep asking for queries until you enter an empty line
+zev --explain "<command>"   Explain what each part of a command does
+zev --timings "<query>"     Show how long each step took and recent latency per profile
 zev --help, -h            Show this help message
-zev --recent, -r          Show recently run commands and results
+zev --recent, -r          Show your most used and recent queries and their results
 zev --setup, -s           Run setup again
 zev --version, -v         Show version information
 """)